@@ -0,0 +1,168 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Union
+import json
+import time
+
+from hw_classes_2 import Advert
+from instrumentation import instrument
+
+
+def _iter_lines(
+        source: Union[str, Iterable[str]]
+) -> Iterator[Tuple[int, str]]:
+    """
+    Построчно читает JSON Lines из файла или итератора строк.
+
+    :param source: путь к файлу или итератор строк.
+    :return: пары (номер строки, строка) без пустых строк.
+    """
+    if isinstance(source, str):
+        with open(source, encoding='utf-8') as file:
+            yield from _iter_lines(file)
+        return
+    for line_number, line in enumerate(source, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def _build_chunk(
+        task: Tuple[List[Tuple[int, str]], bool]
+) -> Tuple[List[Advert], List[Tuple[int, str]]]:
+    """
+    Создаёт объявления из пачки строк. Ошибки разбора и валидации
+    не прерывают пачку, а попадают в список ошибок.
+    Выполняется и в процессах пула.
+
+    :param task: строки с номерами и признак ленивого режима.
+    :return: созданные объявления и ошибки (номер строки, сообщение).
+    """
+    lines, lazy = task
+    adverts = []
+    errors = []
+    for line_number, line in lines:
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise TypeError('Advert must be a JSON object')
+            adverts.append(Advert(data, lazy))
+        except (ValueError, TypeError, AttributeError) as error:
+            errors.append((line_number, f'{type(error).__name__}: {error}'))
+    return adverts, errors
+
+
+class AdvertBatchLoader:
+    """
+    Пакетная загрузка объявлений из JSON Lines. Строки читаются
+    потоково и обрабатываются пачками по chunk_size, при workers > 1 -
+    в пуле процессов (одновременно в работе не больше 2 * workers пачек).
+    Ошибочные объявления собираются в отчёт errors, а не прерывают
+    загрузку; счётчики позволяют оценить пропускную способность.
+    """
+
+    def __init__(self, chunk_size: int = 10000, workers: int = 1,
+                 lazy: bool = False):
+        """
+        Инициализация загрузчика.
+
+        :param chunk_size: число строк в пачке.
+        :param workers: число процессов (1 - без пула процессов).
+        :param lazy: создавать объявления в ленивом режиме.
+        """
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.lazy = lazy
+        self.errors = []
+        self.lines = 0
+        self.adverts = 0
+        self.seconds = 0.0
+
+    def _chunks(self, source: Union[str, Iterable[str]]) \
+            -> Iterator[Tuple[List[Tuple[int, str]], bool]]:
+        lines = _iter_lines(source)
+        while True:
+            chunk = list(islice(lines, self.chunk_size))
+            if not chunk:
+                return
+            self.lines += len(chunk)
+            yield chunk, self.lazy
+
+    def _results(self, source: Union[str, Iterable[str]]) \
+            -> Iterator[Tuple[List[Advert], List[Tuple[int, str]]]]:
+        tasks = self._chunks(source)
+        if self.workers <= 1:
+            yield from map(_build_chunk, tasks)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(_build_chunk, task))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_chunks(self, source: Union[str, Iterable[str]]) \
+            -> Iterator[List[Advert]]:
+        """
+        Потоково возвращает объявления пачками в исходном порядке.
+
+        :param source: путь к файлу JSON Lines или итератор строк.
+        :return: итератор списков объявлений.
+        """
+        results = self._results(source)
+        while True:
+            started = time.perf_counter()
+            result = next(results, None)
+            self.seconds += time.perf_counter() - started
+            if result is None:
+                return
+            adverts, errors = result
+            self.adverts += len(adverts)
+            self.errors.extend(errors)
+            yield adverts
+
+    @instrument
+    def load(self, source: Union[str, Iterable[str]]) -> List[Advert]:
+        """
+        Загружает все объявления из источника.
+
+        :param source: путь к файлу JSON Lines или итератор строк.
+        :return: список объявлений.
+        """
+        result = []
+        for adverts in self.iter_chunks(source):
+            result.extend(adverts)
+        return result
+
+    def throughput(self) -> float:
+        """
+        Возвращает число обработанных строк в секунду.
+        """
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    def report(self) -> dict:
+        """
+        Возвращает счётчики загрузки и отчёт об ошибках.
+        """
+        return {
+            'lines': self.lines,
+            'adverts': self.adverts,
+            'errors': len(self.errors),
+            'seconds': self.seconds,
+            'lines_per_second': self.throughput(),
+            'error_details': list(self.errors)
+        }
+
+
+if __name__ == '__main__':
+    lines = [
+        '{"title": "iPhone X", "price": 100}',
+        '{"title": "python", "price": -1}',
+        'not json',
+        '{"title": "Вельш-корги", "price": 1000, "class": "dogs"}'
+    ]
+    loader = AdvertBatchLoader(chunk_size=2)
+    print(loader.load(lines))
+    print(loader.report())
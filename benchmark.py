@@ -0,0 +1,311 @@
+import argparse
+import bisect
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+_STRUCTURE = {
+    'Аналитика': {'DWH': ('Data Science инженер', 'ML-инженер'),
+                  'Product': ('Data Science инженер', 'ML-инженер')},
+    'Бухгалтерия': {'Зарплата': ('Бухгалтер',),
+                    'Компенсации и льготы': ('Бухгалтер',)},
+    'Маркетинг': {'Direct': ('Маркетинг-менеджер',),
+                  'Performance': ('Маркетинг-менеджер',)},
+    'Продажи': {team: ('Key account manager', 'Sales manager')
+                for team in ('B2B', 'B2C', 'Госы')},
+    'Разработка': {team: ('Android-инженер', 'Backend-инженер',
+                          'Frontend-инженер', 'iOS-инженер',
+                          'Продакт-менеджер')
+                   for team in ('Внутренний портал', 'Основной продукт',
+                                'Платформа')}
+}
+_HEADER = ('ФИО полностью', 'Департамент', 'Отдел', 'Должность', 'Оценка',
+           'Оклад')
+_TITLES = ('iPhone X', 'python', 'Вельш-корги', 'Велосипед', 'Диван',
+           'Ноутбук', 'Квартира', 'Гитара')
+_STATIONS = ('Белорусская', 'Спортивная', 'Гагаринская', 'Лесная',
+             'Тверская', 'Арбатская', 'Динамо')
+
+
+def generate_corp_csv(file_path: str, rows: int, seed: int = 0):
+    """
+    Записывает CSV-файл в формате Corp_Summary.csv.
+    Строки пишутся блоками, так что размер файла не ограничен памятью.
+
+    :param file_path: путь к файлу.
+    :param rows: число сотрудников.
+    :param seed: зерно генератора.
+    """
+    rng = random.Random(seed)
+    positions = [(department, team, position)
+                 for department, teams in _STRUCTURE.items()
+                 for team, team_positions in teams.items()
+                 for position in team_positions]
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        file.write(';'.join(_HEADER) + '\n')
+        for start in range(0, rows, 10000):
+            lines = []
+            for number in range(start, min(start + 10000, rows)):
+                department, team, position = rng.choice(positions)
+                lines.append(f'Сотрудник {number};{department};{team};'
+                             f'{position};{rng.randint(5, 50) / 10};'
+                             f'{rng.randrange(30000, 300000, 100)}\n')
+            file.write(''.join(lines))
+
+
+def generate_corpus(documents: int, vocabulary_size: int = 50000,
+                    words_per_document: int = 20, exponent: float = 1.1,
+                    seed: int = 0) -> Iterator[str]:
+    """
+    Генерирует тексты со словарём, частоты которого подчиняются
+    закону Ципфа.
+
+    :param documents: число текстов.
+    :param vocabulary_size: размер словаря.
+    :param words_per_document: средняя длина текста в словах.
+    :param exponent: показатель распределения Ципфа.
+    :param seed: зерно генератора.
+    :return: итератор текстов.
+    """
+    rng = random.Random(seed)
+    words = [f'w{rank}' for rank in range(vocabulary_size)]
+    cumulative = list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, vocabulary_size + 1)))
+    total = cumulative[-1]
+    for _ in range(documents):
+        length = rng.randint(words_per_document // 2,
+                             words_per_document * 3 // 2)
+        yield ' '.join(words[bisect.bisect(cumulative, rng.random() * total)]
+                       for _ in range(length))
+
+
+def generate_adverts(count: int, seed: int = 0) -> Iterator[dict]:
+    """
+    Генерирует вложенные JSON-объекты объявлений.
+
+    :param count: число объявлений.
+    :param seed: зерно генератора.
+    :return: итератор объявлений.
+    """
+    rng = random.Random(seed)
+    for number in range(count):
+        advert = {
+            'title': f'{rng.choice(_TITLES)} {number}',
+            'location': {
+                'address': f'город Москва, улица {rng.randint(1, 999)}',
+                'metro_stations': rng.sample(_STATIONS, rng.randint(0, 2))
+            }
+        }
+        if rng.random() < 0.9:
+            advert['price'] = rng.randint(0, 100000)
+        if rng.random() < 0.2:
+            advert['class'] = 'dogs'
+        yield advert
+
+
+def _department_report(size: int, workdir: str) -> Tuple[Callable, int]:
+    from main import get_department_report, read_csv
+    file_path = os.path.join(workdir, 'corp.csv')
+    generate_corp_csv(file_path, size)
+    return lambda: get_department_report(read_csv(file_path)), size
+
+
+def _count_vectorizer(size: int, workdir: str) -> Tuple[Callable, int]:
+    from hw_classes_practice import CountVectorizer
+    corpus = list(generate_corpus(size))
+    return lambda: CountVectorizer(sparse=True).fit_transform(corpus), size
+
+
+def _tfidf_vectorizer(size: int, workdir: str) -> Tuple[Callable, int]:
+    from hw_classes_practice import TfidfVectorizer
+    corpus = list(generate_corpus(size))
+    return lambda: TfidfVectorizer(sparse=True).fit_transform(corpus), size
+
+
+def _advert(size: int, workdir: str) -> Tuple[Callable, int]:
+    from hw_classes_2 import Advert
+    adverts = list(generate_adverts(size))
+    return lambda: [Advert(advert) for advert in adverts], size
+
+
+def _schema_advert(size: int, workdir: str) -> Tuple[Callable, int]:
+    from hw_classes_2 import SchemaAdvert
+    adverts = list(generate_adverts(size))
+    return lambda: [SchemaAdvert(advert) for advert in adverts], size
+
+
+CASES = {
+    'department_report': _department_report,
+    'count_vectorizer': _count_vectorizer,
+    'tfidf_vectorizer': _tfidf_vectorizer,
+    'advert': _advert,
+    'schema_advert': _schema_advert
+}
+
+
+def _max_rss_kb() -> int:
+    """
+    Возвращает пиковый RSS процесса в килобайтах.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # в macOS ru_maxrss в байтах, в Linux - в килобайтах
+        peak_rss //= 1024
+    return peak_rss
+
+
+def run_case(name: str, size: int, repeat: int = 3) -> Dict[str, float]:
+    """
+    Выполняет один бенчмарк: лучшее время из repeat запусков,
+    затем отдельный запуск под tracemalloc для пика памяти и числа
+    блоков памяти, которые остаются занятыми после запуска (результат
+    и всё, что он удерживает).
+    Пиковый RSS снимается до и после замеров времени: peak_rss_kb -
+    пик всего процесса вместе с генерацией данных, peak_rss_increase_kb -
+    насколько его подняли сами замеры.
+    Число выделений памяти за запуск не измеряется: CPython не даёт
+    такого счётчика, а tracemalloc и sys.getallocatedblocks видят только
+    живые блоки, поэтому вместо него отчёт содержит retained_blocks.
+
+    :param name: имя бенчмарка из CASES.
+    :param size: размер синтетических данных.
+    :param repeat: число замеров времени.
+    :return: словарь с результатами.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        function, items = CASES[name](size, workdir)
+        gc.collect()
+        setup_rss = _max_rss_kb()
+        seconds = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            function()
+            seconds = min(seconds, time.perf_counter() - started)
+        peak_rss = _max_rss_kb()
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        result = function()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        retained_blocks = sys.getallocatedblocks() - blocks
+        del result
+    return {
+        'items': items,
+        'seconds': seconds,
+        'items_per_second': items / seconds if seconds else 0.0,
+        'peak_rss_kb': peak_rss,
+        'peak_rss_increase_kb': peak_rss - setup_rss,
+        'traced_peak_bytes': traced_peak,
+        'retained_blocks': retained_blocks
+    }
+
+
+def run_benchmarks(names: List[str], size: int,
+                   repeat: int = 3) -> Dict[str, object]:
+    """
+    Выполняет бенчмарки, каждый в отдельном процессе, чтобы пиковая
+    память одного не влияла на замеры другого.
+
+    :param names: имена бенчмарков из CASES.
+    :param size: размер синтетических данных.
+    :param repeat: число замеров времени.
+    :return: отчёт с описанием окружения и результатами.
+    """
+    results = {}
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[name] = executor.submit(run_case, name, size,
+                                            repeat).result()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size': size,
+        'results': results
+    }
+
+
+def compare_with_baseline(report: Dict[str, object],
+                          baseline: Dict[str, object],
+                          threshold: float = 0.1) -> List[str]:
+    """
+    Сравнивает пропускную способность с сохранённым базовым отчётом.
+    Отчёты должны быть сняты на одном размере данных, иначе ValueError.
+
+    :param report: текущий отчёт.
+    :param baseline: базовый отчёт.
+    :param threshold: допустимое относительное замедление.
+    :return: описания замедлившихся бенчмарков.
+    """
+    if baseline['size'] != report['size']:
+        raise ValueError(f'baseline size {baseline["size"]} differs from '
+                         f'benchmark size {report["size"]}')
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['items_per_second'] / base['items_per_second']
+        if ratio < 1 - threshold:
+            regressions.append(f'{name}: {result["items_per_second"]:.0f} '
+                               f'items/s vs {base["items_per_second"]:.0f} '
+                               f'in baseline ({ratio:.0%})')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Бенчмарки отчётов, векторизаторов и объявлений.')
+    parser.add_argument('cases', nargs='*',
+                        help=f'какие бенчмарки запускать: '
+                             f'{", ".join(CASES)} (по умолчанию все)')
+    parser.add_argument('--size', type=float, default=1e4,
+                        help='размер данных (от 1e3 до 1e7)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='число замеров времени')
+    parser.add_argument('--output', help='файл для отчёта в JSON')
+    parser.add_argument('--baseline', help='базовый отчёт для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='допустимое замедление относительно базы')
+    args = parser.parse_args(argv)
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline['size'] != int(args.size):
+            parser.error(f'baseline was run with --size {baseline["size"]}, '
+                         f'not {int(args.size)}')
+
+    report = run_benchmarks(args.cases or list(CASES), int(args.size),
+                            args.repeat)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    if baseline is not None:
+        regressions = compare_with_baseline(report, baseline,
+                                            args.threshold)
+        for regression in regressions:
+            print(f'Замедление: {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
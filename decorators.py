@@ -0,0 +1,224 @@
+import contextvars
+import functools
+import inspect
+import sys
+import time
+from typing import Callable, Optional, TextIO
+
+_target = contextvars.ContextVar('stdout_target', default=None)
+
+
+class _StdoutProxy:
+    """
+    Подменяет sys.stdout один раз и направляет запись в поток,
+    выбранный в текущем контексте. Контекст свой у каждого потока
+    и у каждой задачи asyncio, поэтому перенаправление в одной из них
+    не влияет на остальные.
+    """
+
+    def __init__(self, original: TextIO):
+        """
+        :param original: поток вывода по умолчанию.
+        """
+        self.original = original
+
+    def _current(self) -> TextIO:
+        target = _target.get()
+        return self.original if target is None else target
+
+    def write(self, text: str) -> int:
+        target = _target.get()
+        if target is None:
+            return self.original.write(text)
+        return target.write(text)
+
+    def flush(self):
+        self._current().flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._current(), name)
+
+
+def _install() -> _StdoutProxy:
+    """
+    Устанавливает прокси в sys.stdout, если он ещё не установлен
+    (или sys.stdout с тех пор подменили).
+
+    :return: установленный прокси.
+    """
+    stdout = sys.stdout
+    if not isinstance(stdout, _StdoutProxy):
+        stdout = sys.stdout = _StdoutProxy(stdout)
+    return stdout
+
+
+def _current_stdout() -> TextIO:
+    """
+    Возвращает поток, в который сейчас пишет контекст.
+    """
+    return _install()._current()
+
+
+class _Timestamp:
+    """
+    Метка времени, которая форматируется не чаще раза в секунду.
+    """
+
+    __slots__ = ('fmt', 'second', 'text')
+
+    def __init__(self, fmt: str = "[%Y-%m-%d %H:%M:%S]"):
+        """
+        :param fmt: формат метки для strftime.
+        """
+        self.fmt = fmt
+        self.second = None
+        self.text = ''
+
+    def __call__(self) -> str:
+        now = time.time()
+        second = int(now)
+        if second != self.second:
+            self.second = second
+            self.text = time.strftime(self.fmt, time.localtime(now))
+        return self.text
+
+
+_timestamp = _Timestamp()
+
+
+class TimedWriter:
+    """
+    Файлоподобный объект, добавляющий метку времени
+    перед каждой записью (кроме переводов строки).
+    """
+
+    def __init__(self, target: TextIO, timestamp: _Timestamp = _timestamp):
+        """
+        :param target: поток, в который пишется текст с метками.
+        :param timestamp: источник меток времени.
+        """
+        self.target = target
+        self.timestamp = timestamp
+
+    def write(self, text: str) -> int:
+        """
+        Записывает текст с меткой времени.
+
+        :param text: текст.
+        :return: число записанных символов исходного текста.
+        """
+        if text and text != '\n':
+            self.target.write(f"{self.timestamp()}: {text}")
+        else:
+            self.target.write(text)
+        return len(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+def _redirected(function: Callable,
+                make_writer: Callable[[], TextIO],
+                close: Callable[[TextIO], None]) -> Callable:
+    """
+    Оборачивает функцию (обычную или асинхронную) так, чтобы на время
+    вызова её вывод шёл в поток, созданный make_writer.
+    Поток выбирается в момент вызова, а не декорирования.
+
+    :param function: оборачиваемая функция.
+    :param make_writer: создаёт поток для вывода вызова.
+    :param close: завершает работу с потоком после вызова.
+    :return: обёртка.
+    """
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            writer = make_writer()
+            token = _target.set(writer)
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                _target.reset(token)
+                close(writer)
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        writer = make_writer()
+        token = _target.set(writer)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _target.reset(token)
+            close(writer)
+    return wrapper
+
+
+def timed_output(function: Callable) -> Callable:
+    """
+    Декоратор, помечающий весь вывод функции меткой времени.
+
+    :param function: декорируемая функция.
+    :return: обёртка.
+    """
+    return _redirected(function,
+                       lambda: TimedWriter(_current_stdout()),
+                       lambda writer: None)
+
+
+def redirect_output(filepath: str, mode: str = 'w',
+                    buffer_size: int = 65536,
+                    line_buffering: bool = False) -> Callable:
+    """
+    Декоратор, перенаправляющий вывод функции в файл.
+    Вывод буферизуется и записывается в файл крупными блоками;
+    буфер сбрасывается при заполнении, после каждой строки
+    (если line_buffering) и по завершении вызова.
+
+    :param filepath: путь к файлу.
+    :param mode: режим открытия файла ('w' или 'a').
+    :param buffer_size: размер буфера в байтах.
+    :param line_buffering: сбрасывать буфер после каждой строки.
+    :return: декоратор.
+    """
+    def make_writer() -> TextIO:
+        _install()
+        file = open(filepath, mode, buffering=buffer_size,
+                    encoding='utf-8')
+        if line_buffering:
+            file.reconfigure(line_buffering=True)
+        return file
+
+    def decorator(function: Callable) -> Callable:
+        return _redirected(function, make_writer,
+                           lambda file: file.close())
+    return decorator
+
+
+def restore_stdout(stdout: Optional[TextIO] = None):
+    """
+    Снимает прокси с sys.stdout.
+
+    :param stdout: поток, который нужно вернуть
+    (по умолчанию - поток, подменённый прокси).
+    """
+    if isinstance(sys.stdout, _StdoutProxy):
+        sys.stdout = stdout or sys.stdout.original
+
+
+if __name__ == '__main__':
+    @timed_output
+    def print_greeting(name):
+        print(f'Hello, {name}!')
+
+    @redirect_output('./function_output.txt')
+    def calculate():
+        for power in range(1, 5):
+            for num in range(1, 20):
+                print(num ** power, end=' ')
+            print()
+
+    print_greeting("Nikita")
+    calculate()
+    with open('./function_output.txt', encoding='utf-8') as file:
+        print(file.read(), end='')
@@ -0,0 +1,334 @@
+import csv
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import (Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple, Union)
+
+LEVELS = ('department', 'team', 'position')
+_LEVEL_COLUMNS = ('Департамент', 'Отдел', 'Должность')
+_STAT_COLUMNS = ('Численность', 'Минимальная зарплата',
+                 'Максимальная зарплата', 'Средняя зарплата',
+                 'Средняя оценка')
+
+_MAGIC = b'OMDR'
+_VERSION = 1
+# magic, version, number of rows, length of the JSON schema
+_HEADER = struct.Struct('<4sHQQ')
+
+
+class LevelStats:
+    """
+    Агрегаты одного узла иерархии: численность, вилка зарплат,
+    суммы окладов и оценок.
+    """
+
+    __slots__ = ('count', 'min_salary', 'max_salary', 'total_salary',
+                 'total_rating')
+
+    def __init__(self):
+        self.count = 0
+        self.min_salary = None
+        self.max_salary = None
+        self.total_salary = 0
+        self.total_rating = 0.0
+
+    def update(self, salary: int, rating: float):
+        """
+        Добавляет в агрегаты одного сотрудника.
+        """
+        self.count += 1
+        if self.min_salary is None or salary < self.min_salary:
+            self.min_salary = salary
+        if self.max_salary is None or salary > self.max_salary:
+            self.max_salary = salary
+        self.total_salary += salary
+        self.total_rating += rating
+
+    @property
+    def mean_salary(self) -> float:
+        return self.total_salary / self.count
+
+    @property
+    def mean_rating(self) -> float:
+        return self.total_rating / self.count
+
+
+class HierarchyNode:
+    """
+    Узел иерархии (департамент, отдел или должность) с агрегатами
+    и дочерними узлами в порядке первого появления.
+    """
+
+    __slots__ = ('name', 'path', 'stats', 'children')
+
+    def __init__(self, name: str, path: Tuple[str, ...]):
+        """
+        :param name: название узла
+        :param path: путь от департамента до узла
+        """
+        self.name = name
+        self.path = path
+        self.stats = LevelStats()
+        self.children: Dict[str, 'HierarchyNode'] = {}
+
+
+class DepartmentIndex:
+    """
+    Индексированная иерархия департамент -> отдел -> должность
+    с агрегатами на каждом уровне. Все узлы лежат в словаре по пути,
+    поэтому проверка принадлежности и поиск узла выполняются за O(1),
+    а иерархия и отчёты строятся без повторного прохода по данным.
+    """
+
+    def __init__(self):
+        self.departments: Dict[str, HierarchyNode] = {}
+        self._nodes: Dict[Tuple[str, ...], HierarchyNode] = {}
+
+    def _child(self, children: Dict[str, HierarchyNode], name: str,
+               path: Tuple[str, ...]) -> HierarchyNode:
+        node = children.get(name)
+        if node is None:
+            node = children[name] = self._nodes[path] = \
+                HierarchyNode(name, path)
+        return node
+
+    def add(self, department: str, team: str, position: str,
+            salary: int, rating: float):
+        """
+        Добавляет сотрудника и обновляет агрегаты всех трёх уровней.
+        """
+        department_node = self._child(self.departments, department,
+                                      (department,))
+        team_node = self._child(department_node.children, team,
+                                (department, team))
+        position_node = self._child(team_node.children, position,
+                                    (department, team, position))
+        department_node.stats.update(salary, rating)
+        team_node.stats.update(salary, rating)
+        position_node.stats.update(salary, rating)
+
+    @classmethod
+    def from_records(cls,
+                     data: Iterable[Dict[str, str]]) -> 'DepartmentIndex':
+        """
+        Строит индекс по словарям с данными о сотрудниках
+        (за один проход, подходит и ленивый итератор).
+        :param data: словари с данными о сотрудниках
+        :return: индекс
+        """
+        index = cls()
+        for employee in data:
+            index.add(employee['Департамент'], employee['Отдел'],
+                      employee['Должность'], int(employee['Оклад']),
+                      float(employee['Оценка']))
+        return index
+
+    @classmethod
+    def from_table(cls, table) -> 'DepartmentIndex':
+        """
+        Строит индекс по колоночной таблице (main.EmployeeTable).
+        :param table: колоночная таблица
+        :return: индекс
+        """
+        index = cls()
+        departments, teams, positions = (table.departments, table.teams,
+                                         table.positions)
+        for department, team, position, salary, rating in zip(
+                table.department_codes, table.team_codes,
+                table.position_codes, table.salaries, table.ratings):
+            index.add(departments[department], teams[team],
+                      positions[position], salary, rating)
+        return index
+
+    def __contains__(self, path: Union[str, Tuple[str, ...]]) -> bool:
+        if isinstance(path, str):
+            path = (path,)
+        return path in self._nodes
+
+    def __len__(self) -> int:
+        return sum(node.stats.count for node in self.departments.values())
+
+    def get(self, *path: str) -> Optional[HierarchyNode]:
+        """
+        Возвращает узел по пути (департамент[, отдел[, должность]]).
+        """
+        return self._nodes.get(path)
+
+    def nodes(self, level: str = 'department') -> Iterator[HierarchyNode]:
+        """
+        Перебирает узлы одного уровня в порядке первого появления.
+        :param level: 'department', 'team' или 'position'
+        """
+        depth = _depth(level)
+        nodes = self.departments.values()
+        for _ in range(depth):
+            nodes = [child for node in nodes
+                     for child in node.children.values()]
+        return iter(nodes)
+
+    def hierarchy(self) -> Dict[str, List[str]]:
+        """
+        Возвращает иерархию департаментов и команд
+        (как get_department_hierarchy).
+        """
+        return {department: list(node.children)
+                for department, node in self.departments.items()}
+
+    def department_report(
+            self
+    ) -> List[Tuple[str, int, Tuple[int, int], float]]:
+        """
+        Возвращает сводный отчёт по департаментам
+        (как get_department_report).
+        """
+        return [(department, node.stats.count,
+                 (node.stats.min_salary, node.stats.max_salary),
+                 node.stats.mean_salary)
+                for department, node in self.departments.items()]
+
+    def report_columns(self, level: str = 'team') -> Dict[str, list]:
+        """
+        Возвращает отчёт по уровню иерархии в виде колонок:
+        путь узла, численность, вилка и средняя зарплата, средняя оценка.
+        :param level: 'department', 'team' или 'position'
+        :return: словарь название колонки -> список значений
+        """
+        nodes = list(self.nodes(level))
+        columns = {}
+        for depth, name in enumerate(_LEVEL_COLUMNS[:_depth(level) + 1]):
+            columns[name] = [node.path[depth] for node in nodes]
+        stats = [node.stats for node in nodes]
+        columns[_STAT_COLUMNS[0]] = [item.count for item in stats]
+        columns[_STAT_COLUMNS[1]] = [item.min_salary for item in stats]
+        columns[_STAT_COLUMNS[2]] = [item.max_salary for item in stats]
+        columns[_STAT_COLUMNS[3]] = [item.mean_salary for item in stats]
+        columns[_STAT_COLUMNS[4]] = [item.mean_rating for item in stats]
+        return columns
+
+
+def _depth(level: str) -> int:
+    if level not in LEVELS:
+        raise ValueError(f'Unknown level: {level}')
+    return LEVELS.index(level)
+
+
+def report_columns(
+        report: List[Tuple[str, int, Tuple[int, int], float]]
+) -> Dict[str, list]:
+    """
+    Переводит сводный отчёт по департаментам в колонки.
+    :param report: список кортежей с данными о департаментах
+    :return: словарь название колонки -> список значений
+    """
+    return {
+        'Департамент': [row[0] for row in report],
+        'Численность': [row[1] for row in report],
+        'Минимальная зарплата': [row[2][0] for row in report],
+        'Максимальная зарплата': [row[2][1] for row in report],
+        'Средняя зарплата': [row[3] for row in report]
+    }
+
+
+def save_csv(columns: Dict[str, Sequence], file_path: str):
+    """
+    Сохраняет колонки в csv-файл одной пакетной записью.
+    :param columns: словарь название колонки -> значения
+    :param file_path: путь к файлу
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+
+
+def _column_type(values: Sequence) -> str:
+    if all(isinstance(value, str) for value in values):
+        return 's'
+    if all(isinstance(value, int) for value in values):
+        return 'q'
+    return 'd'
+
+
+def save_columnar(columns: Dict[str, Sequence], file_path: str):
+    """
+    Сохраняет колонки в компактный двоичный колоночный файл:
+    заголовок, JSON-схема и выровненные по 8 байт буферы колонок
+    (числа - массивы int64/float64, строки - смещения и UTF-8 данные).
+    Файл собирается в памяти, пишется за одну запись во временный файл
+    и переносится на место целевого, так что процессы, отобразившие
+    старый файл через load_columnar, продолжают работать с ним;
+    читать его можно без разбора текста (см. load_columnar).
+    :param columns: словарь название колонки -> значения
+    :param file_path: путь к файлу
+    """
+    n_rows = len(next(iter(columns.values()), ()))
+    buffers = []
+    schema = []
+    for name, values in columns.items():
+        if len(values) != n_rows:
+            raise ValueError(f'Column {name} has {len(values)} values, '
+                             f'expected {n_rows}')
+        column_type = _column_type(values)
+        if column_type == 's':
+            encoded = [value.encode('utf-8') for value in values]
+            offsets = array('q', [0])
+            total = 0
+            for item in encoded:
+                total += len(item)
+                offsets.append(total)
+            parts = [offsets.tobytes(), b''.join(encoded)]
+        else:
+            parts = [array(column_type, values).tobytes()]
+        schema.append({'name': name, 'type': column_type,
+                       'lengths': [len(part) for part in parts]})
+        buffers.extend(parts)
+    schema_bytes = json.dumps(schema, ensure_ascii=False).encode('utf-8')
+    output = bytearray(_HEADER.pack(_MAGIC, _VERSION, n_rows,
+                                    len(schema_bytes)))
+    output += schema_bytes
+    for part in buffers:
+        output += bytes(-len(output) % 8)
+        output += part
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(output)
+    os.replace(tmp_path, file_path)
+
+
+def load_columnar(file_path: str) -> Dict[str, Sequence]:
+    """
+    Загружает файл, сохранённый save_columnar. Файл отображается
+    в память: числовые колонки возвращаются как memoryview над ним
+    без копирования, строковые декодируются в списки.
+    :param file_path: путь к файлу
+    :return: словарь название колонки -> значения
+    """
+    with open(file_path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, n_rows, schema_length = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f'{file_path} is not a columnar report')
+    offset = _HEADER.size
+    schema = json.loads(buffer[offset:offset + schema_length]
+                        .decode('utf-8'))
+    offset += schema_length
+    view = memoryview(buffer)
+    columns = {}
+    for column in schema:
+        parts = []
+        for length in column['lengths']:
+            offset += -offset % 8
+            parts.append(view[offset:offset + length])
+            offset += length
+        if column['type'] == 's':
+            offsets = parts[0].cast('q')
+            data = bytes(parts[1])
+            columns[column['name']] = [
+                data[offsets[row]:offsets[row + 1]].decode('utf-8')
+                for row in range(n_rows)]
+        else:
+            columns[column['name']] = parts[0].cast(column['type'])
+    return columns
@@ -0,0 +1,276 @@
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+STATISTICS = ('count', 'min', 'max', 'mean', 'median', 'p90',
+              'mean_rating', 'correlation')
+DEFAULT_STATISTICS = ('count', 'min', 'max', 'mean', 'median', 'p90',
+                      'mean_rating')
+_QUANTILES = {'median': 0.5, 'p90': 0.9}
+
+
+def exact_quantile(values: Sequence[float], q: float) -> float:
+    """
+    Точный квантиль с линейной интерполяцией между соседними значениями
+    (для q=0.5 совпадает с обычной медианой).
+    :param values: отсортированные значения
+    :param q: уровень квантиля от 0 до 1
+    :return: значение квантиля
+    """
+    position = q * (len(values) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    fraction = position - lower
+    return values[lower] + (values[upper] - values[lower]) * fraction
+
+
+class KLLSketch:
+    """
+    Потоковый скетч квантилей KLL. Хранит O(k) значений независимо
+    от их общего числа; ошибка ранга порядка 1/k.
+    Скетчи можно сливать, поэтому они подходят для частичных агрегатов.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = 0):
+        """
+        :param k: размер верхнего компактора (точность скетча)
+        :param seed: зерно генератора случайных чисел для воспроизводимости
+        """
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = self._capacity(0)
+        self._random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        """
+        Вместимость компактора уровня level: уровни ниже верхнего
+        уменьшаются в геометрической прогрессии.
+        """
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(level)
+                            for level in range(len(self.compactors)))
+
+    def _compact(self, level: int):
+        """
+        Сортирует компактор и переносит каждое второе значение
+        на уровень выше (вес значения удваивается).
+        """
+        items = self.compactors[level]
+        items.sort()
+        last = items.pop() if len(items) % 2 else None
+        offset = self._random.randint(0, 1)
+        self.compactors[level + 1].extend(items[offset::2])
+        self.compactors[level] = [] if last is None else [last]
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self._grow()
+                self._compact(level)
+                self.size = sum(len(items) for items in self.compactors)
+                if self.size < self.max_size:
+                    break
+
+    def update(self, value: float):
+        """
+        Добавляет значение в скетч.
+        """
+        self.compactors[0].append(value)
+        self.size += 1
+        self.count += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def merge(self, other: 'KLLSketch'):
+        """
+        Добавляет в скетч все значения другого скетча.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self.size = sum(len(items) for items in self.compactors)
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantile(self, q: float) -> float:
+        """
+        Приближённый квантиль уровня q.
+        :param q: уровень квантиля от 0 до 1
+        :return: значение квантиля
+        """
+        weighted = sorted((value, 1 << level)
+                          for level, items in enumerate(self.compactors)
+                          for value in items)
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+
+class QuantileAccumulator:
+    """
+    Накопитель для квантилей: пока значений не больше exact_limit,
+    они хранятся целиком и квантили точные; дальше значения
+    переносятся в скетч KLL с ограниченной памятью.
+    """
+
+    __slots__ = ('exact_limit', 'sketch_k', 'values', 'sketch')
+
+    def __init__(self, exact_limit: int = 10000, sketch_k: int = 200):
+        """
+        :param exact_limit: до какого числа значений считать точно
+        :param sketch_k: точность скетча
+        """
+        self.exact_limit = exact_limit
+        self.sketch_k = sketch_k
+        self.values = []
+        self.sketch = None
+
+    def update(self, value: float):
+        if self.sketch is not None:
+            self.sketch.update(value)
+            return
+        self.values.append(value)
+        if len(self.values) > self.exact_limit:
+            self.sketch = KLLSketch(self.sketch_k)
+            for item in self.values:
+                self.sketch.update(item)
+            self.values = None
+
+    def quantile(self, q: float) -> float:
+        if self.sketch is not None:
+            return self.sketch.quantile(q)
+        self.values.sort()
+        return exact_quantile(self.values, q)
+
+
+class GroupStats:
+    """
+    Потоковая статистика по группе сотрудников: оклады, оценки
+    и корреляция оклада с оценкой (через совместные моменты Уэлфорда).
+    """
+
+    __slots__ = ('count', 'min_salary', 'max_salary', 'total_salary',
+                 'mean_salary', 'mean_rating', 'm2_salary', 'm2_rating',
+                 'co_moment', 'quantiles')
+
+    def __init__(self, quantiles: Optional[QuantileAccumulator] = None):
+        """
+        :param quantiles: накопитель квантилей окладов
+        (None, если квантили не нужны)
+        """
+        self.count = 0
+        self.min_salary = None
+        self.max_salary = None
+        self.total_salary = 0
+        self.mean_salary = 0.0
+        self.mean_rating = 0.0
+        self.m2_salary = 0.0
+        self.m2_rating = 0.0
+        self.co_moment = 0.0
+        self.quantiles = quantiles
+
+    def update(self, salary: int, rating: float):
+        """
+        Добавляет в статистику одного сотрудника.
+        """
+        self.count += 1
+        if self.min_salary is None or salary < self.min_salary:
+            self.min_salary = salary
+        if self.max_salary is None or salary > self.max_salary:
+            self.max_salary = salary
+        self.total_salary += salary
+        delta_salary = salary - self.mean_salary
+        delta_rating = rating - self.mean_rating
+        self.mean_salary += delta_salary / self.count
+        self.mean_rating += delta_rating / self.count
+        self.m2_salary += delta_salary * (salary - self.mean_salary)
+        self.m2_rating += delta_rating * (rating - self.mean_rating)
+        self.co_moment += delta_salary * (rating - self.mean_rating)
+        if self.quantiles is not None:
+            self.quantiles.update(salary)
+
+    def correlation(self) -> float:
+        """
+        Коэффициент корреляции Пирсона между окладом и оценкой
+        (nan, если одна из величин не меняется).
+        """
+        if self.m2_salary == 0 or self.m2_rating == 0:
+            return math.nan
+        return self.co_moment / math.sqrt(self.m2_salary * self.m2_rating)
+
+    def get(self, statistic: str) -> float:
+        """
+        Возвращает значение одной статистики по её имени из STATISTICS.
+        """
+        if statistic == 'count':
+            return self.count
+        if statistic == 'min':
+            return self.min_salary
+        if statistic == 'max':
+            return self.max_salary
+        if statistic == 'mean':
+            return self.total_salary / self.count
+        if statistic in _QUANTILES:
+            return self.quantiles.quantile(_QUANTILES[statistic])
+        if statistic == 'mean_rating':
+            return self.mean_rating
+        if statistic == 'correlation':
+            return self.correlation()
+        raise ValueError(f'Unknown statistic: {statistic}')
+
+
+def get_extended_report(
+        data: Iterable[Dict[str, str]],
+        statistics: Sequence[str] = DEFAULT_STATISTICS,
+        by: str = 'department',
+        exact_limit: int = 10000,
+        sketch_k: int = 200
+) -> List[Tuple[str, Dict[str, float]]]:
+    """
+    Возвращает расширенный отчёт по департаментам или командам.
+    Данные читаются за один проход, поэтому подходит и ленивый
+    итератор строк. Квантили считаются точно, пока в группе не больше
+    exact_limit сотрудников, и по скетчу KLL для больших групп.
+    :param data: словари с данными о сотрудниках
+    :param statistics: имена статистик из STATISTICS
+    :param by: 'department' - по департаментам, 'team' - по командам
+    (название команды выводится вместе с департаментом)
+    :param exact_limit: до какого размера группы квантили точные
+    :param sketch_k: точность скетча квантилей
+    :return: список пар (название группы, словарь статистик)
+    """
+    unknown = set(statistics) - set(STATISTICS)
+    if unknown:
+        raise ValueError(f'Unknown statistics: {", ".join(sorted(unknown))}')
+    if by not in ('department', 'team'):
+        raise ValueError(f'Unknown grouping: {by}')
+    need_quantiles = any(statistic in _QUANTILES for statistic in statistics)
+    groups = {}
+    for employee in data:
+        if by == 'department':
+            key = employee['Департамент']
+        else:
+            key = f"{employee['Департамент']} / {employee['Отдел']}"
+        stats = groups.get(key)
+        if stats is None:
+            quantiles = (QuantileAccumulator(exact_limit, sketch_k)
+                         if need_quantiles else None)
+            stats = groups[key] = GroupStats(quantiles)
+        stats.update(int(employee['Оклад']), float(employee['Оценка']))
+    return [(key, {statistic: stats.get(statistic)
+                   for statistic in statistics})
+            for key, stats in groups.items()]
@@ -1,3 +1,8 @@
+from array import array
+
+from hw_classes_practice import CSRMatrix, Tokenizer
+
+
 class CountVectorizer:
     """
     A class for converting a collection of text documents
@@ -9,13 +14,21 @@ class CountVectorizer:
         feature_names (list): A list of the unique words in the documents.
     """
 
-    def __init__(self):
+    def __init__(self, sparse=False, tokenizer=None):
         """
         Initializes a CountVectorizer object with
         an empty vocabulary and feature_names list.
+
+        Args:
+            sparse (bool): Whether fit_transform returns a CSRMatrix
+            instead of a dense list of lists.
+            tokenizer (Tokenizer): The tokenizer pipeline; by default
+            documents are split on whitespace and lowercased.
         """
         self.vocab = {}
         self.feature_names = []
+        self.sparse = sparse
+        self.tokenizer = tokenizer if tokenizer is not None else Tokenizer()
 
     def fit_transform(self, documents):
         """
@@ -27,27 +40,57 @@ class CountVectorizer:
             the text documents.
 
         Returns:
-            result (list): A list of lists representing
-            the matrix of token counts for each document.
+            result (list or CSRMatrix): A list of lists (or a sparse
+            matrix if sparse=True) representing the matrix of token counts
+            for each document.
         """
+        if self.sparse:
+            return self._count_sparse(documents)
+        docs = []
         for doc in documents:
-            words = doc.split()
-            words = [word.lower() for word in words]
+            words = self.tokenizer(doc)
             for word in words:
                 if word not in self.vocab:
                     self.vocab[word] = len(self.vocab)
                     self.feature_names.append(word)
+            docs.append(words)
         result = []
-        for doc in documents:
+        for words in docs:
             vector = [0] * len(self.vocab)
-            words = doc.split()
-            words = [word.lower() for word in words]
             for word in words:
-                if word in self.vocab:
-                    vector[self.vocab[word]] += 1
+                vector[self.vocab[word]] += 1
             result.append(vector)
         return result
 
+    def _count_sparse(self, documents):
+        """
+        Builds the vocabulary and the CSR count matrix in a single pass,
+        without materialising dense rows.
+
+        Args:
+            documents (list): A list of strings representing
+            the text documents.
+
+        Returns:
+            result (CSRMatrix): The sparse matrix of token counts.
+        """
+        indptr = array('q', [0])
+        indices = array('i')
+        data = array('q')
+        for doc in documents:
+            counts = {}
+            for word in self.tokenizer(doc):
+                index = self.vocab.get(word)
+                if index is None:
+                    index = self.vocab[word] = len(self.vocab)
+                    self.feature_names.append(word)
+                counts[index] = counts.get(index, 0) + 1
+            for index in sorted(counts):
+                indices.append(index)
+                data.append(counts[index])
+            indptr.append(len(indices))
+        return CSRMatrix(indptr, indices, data, len(self.vocab))
+
     def get_feature_names(self):
         """
         Returns the list of unique words in the documents.
@@ -1,5 +1,76 @@
-from typing import Union
+from typing import Iterable, List, Optional, TextIO, Union
 import keyword
+import sys
+
+from instrumentation import instrument
+
+
+class LazyJSONConverter:
+    """
+    Ленивый узел JSON-объекта с доступом к атрибутам через точку.
+    Хранит разобранный JSON как есть и создаёт дочерние узлы только
+    при первом обращении к атрибуту, после чего кеширует их.
+    Атрибуты те же, что у JSONConverter: ключи словаря (с "_" в конце
+    для ключевых слов Python), items для списков и value для значений.
+    """
+
+    __slots__ = ('_data', '_children')
+
+    def __init__(self, data: Union[dict, list, int, str]):
+        """
+        Инициализация узла.
+
+        :param data: JSON-объект или значение простого типа.
+        """
+        self._data = data
+        self._children = None
+
+    def __getattr__(self, name: str):
+        """
+        Создаёт (или берёт из кеша) дочерний узел для атрибута.
+
+        :param name: имя атрибута.
+        :return: дочерний узел, список узлов или значение.
+        """
+        if name in LazyJSONConverter.__slots__:
+            raise AttributeError(name)
+        children = self._children
+        if children is not None and name in children:
+            return children[name]
+        data = self._data
+        if isinstance(data, dict):
+            key = name
+            if name.endswith('_') and keyword.iskeyword(name[:-1]):
+                key = name[:-1]
+            elif keyword.iskeyword(name):
+                raise AttributeError(name)
+            if key not in data:
+                raise AttributeError(name)
+            child = LazyJSONConverter(data[key])
+        elif isinstance(data, list):
+            if name != 'items':
+                raise AttributeError(name)
+            child = [LazyJSONConverter(item) for item in data]
+        elif name == 'value':
+            return data
+        else:
+            raise AttributeError(name)
+        if children is None:
+            children = self._children = {}
+        children[name] = child
+        return child
+
+    def __setattr__(self, name: str, value):
+        """
+        Служебные поля хранятся в слотах, остальные атрибуты -
+        среди дочерних узлов.
+        """
+        if name in LazyJSONConverter.__slots__:
+            object.__setattr__(self, name, value)
+            return
+        if self._children is None:
+            self._children = {}
+        self._children[name] = value
 
 
 class JSONConverter:
@@ -16,6 +87,7 @@ class JSONConverter:
         """
         self._convert(data)
 
+    @instrument
     def _convert(self, data: Union[dict, list, int, str]):
         """
         Рекурсивное преобразование JSON-объекта в атрибуты текущего объекта.
@@ -32,6 +104,9 @@ class JSONConverter:
             setattr(self, "value", data)
 
 
+_COLOR_RESET = "\033[0m"
+
+
 class ColorizeMixin:
     """
     Миксин для изменения цвета текста при выводе на консоль.
@@ -46,6 +121,7 @@ class ColorizeMixin:
         """
         super().__init_subclass__(**kwargs)
         cls.repr_color_code = repr_color_code
+        cls.color_prefix = f"\033[{repr_color_code}m"
 
     def colorize_text(self, text):
         """
@@ -54,7 +130,7 @@ class ColorizeMixin:
         :param text: Текст для применения цвета.
         :return: Текст с примененным цветом.
         """
-        return f"\033[{self.repr_color_code}m{text}\033[0m"
+        return self.color_prefix + text + _COLOR_RESET
 
 
 class Advert(ColorizeMixin, JSONConverter, repr_color_code=33):
@@ -62,11 +138,31 @@ class Advert(ColorizeMixin, JSONConverter, repr_color_code=33):
     Класс для представления объявлений с дополнительной валидацией цены.
     """
 
-    def __init__(self, data: dict):
+    def __new__(cls, data: Optional[dict] = None, lazy: bool = False):
+        """
+        Создаёт объявление; при lazy=True - ленивое (LazyAdvert).
+
+        :param data: JSON-объект с данными объявления.
+        :param lazy: создавать атрибуты при первом обращении,
+        так что создание объявления стоит O(прочитанных полей).
+        """
+        if not lazy:
+            return object.__new__(cls)
+        advert = object.__new__(LazyAdvert)
+        if not isinstance(advert, cls):
+            # __init__ вызывается автоматически, только если объект
+            # является экземпляром запрошенного класса
+            advert.__init__(data)
+        return advert
+
+    @instrument
+    def __init__(self, data: dict, lazy: bool = False):
         """
         Инициализация объекта класса Advert.
 
         :param data: JSON-объект с данными объявления.
+        :param lazy: создавать атрибуты при первом обращении
+        (см. __new__).
         """
         super().__init__(data)
         self._validate_price()
@@ -77,8 +173,25 @@ class Advert(ColorizeMixin, JSONConverter, repr_color_code=33):
 
         :return: Строковое представление объявления.
         """
-        self.content = f"{self.title.value} | {self.price.value} ₽"
-        return self.colorize_text(self.content)
+        return self.render()
+
+    def render(self, color: bool = True) -> str:
+        """
+        Возвращает строковое представление объявления, не изменяя его
+        атрибутов. Готовый текст кешируется и пересчитывается, только
+        если название или цена изменились.
+
+        :param color: раскрасить текст кодом цвета ANSI.
+        :return: Строковое представление объявления.
+        """
+        title = self.title.value
+        price = self.price.value
+        cache = self.__dict__.get('_render_cache')
+        if cache is None or cache[0] is not title or cache[1] is not price:
+            text = f"{title} | {price} ₽"
+            cache = (title, price, text, self.colorize_text(text))
+            self.__dict__['_render_cache'] = cache
+        return cache[3] if color else cache[2]
 
     def _validate_price(self) -> None:
         """
@@ -92,5 +205,204 @@ class Advert(ColorizeMixin, JSONConverter, repr_color_code=33):
             raise ValueError("Price must be >= 0")
 
 
+class LazyAdvert(Advert, repr_color_code=Advert.repr_color_code):
+    """
+    Объявление, атрибуты которого создаются при первом обращении
+    (см. LazyJSONConverter). Создаётся вызовом Advert(data, lazy=True).
+    Перехват отсутствующих атрибутов (__getattr__) есть только
+    у этого класса, так что обычные объявления его не замедляет.
+    """
+
+    def __init__(self, data: dict, lazy: bool = True):
+        """
+        Инициализация ленивого объявления.
+
+        :param data: JSON-объект с данными объявления.
+        :param lazy: не используется (объявление всегда ленивое).
+        """
+        self._lazy = LazyJSONConverter(data)
+        self._validate_price()
+
+    def __getattr__(self, name: str):
+        """
+        Берёт атрибут из ленивого узла.
+
+        :param name: имя атрибута.
+        """
+        lazy = self.__dict__.get('_lazy')
+        if lazy is None:
+            raise AttributeError(name)
+        return getattr(lazy, name)
+
+
+ADVERT_SCHEMA = ('title', 'price', 'location.address',
+                 'location.metro_stations', 'class')
+_SCALARS = frozenset((str, int, float, bool, type(None)))
+_MISSING = object()
+
+
+class _Value(JSONConverter):
+    """
+    Узел со значением простого типа для объявлений, собранных по схеме:
+    значение хранится в слоте, так что словарь атрибутов не создаётся.
+    """
+
+    __slots__ = ('value',)
+
+
+def _leaf(value) -> JSONConverter:
+    """
+    Создаёт узел со значением простого типа без вызова __init__.
+    """
+    node = object.__new__(_Value)
+    node.value = value
+    return node
+
+
+def _list_node(items: list) -> JSONConverter:
+    """
+    Создаёт узел списка; простые значения оборачиваются напрямую.
+    """
+    node = object.__new__(JSONConverter)
+    node.items = [_leaf(item) if type(item) in _SCALARS
+                  else JSONConverter(item) for item in items]
+    return node
+
+
+def _convert_rest(attributes: dict, data: dict, keys: frozenset):
+    """
+    Обычным путём преобразует ключи, которых нет в схеме.
+
+    :param attributes: словарь атрибутов (__dict__) объекта.
+    :param data: JSON-объект.
+    :param keys: ключи, уже разобранные по схеме.
+    """
+    for key, value in data.items():
+        if key not in keys:
+            key = key + "_" if keyword.iskeyword(key) else key
+            attributes[key] = JSONConverter(value)
+
+
+def _schema_tree(fields: Iterable[str]) -> dict:
+    """
+    Строит дерево полей схемы (вложенные поля через точку).
+    """
+    tree = {}
+    for field in fields:
+        level = tree
+        for key in field.split('.'):
+            level = level.setdefault(key, {})
+    return tree
+
+
+def _compile_object(tree: dict, depth: int, lines: List[str],
+                    namespace: dict, indent: str):
+    """
+    Генерирует код, заполняющий атрибуты attributes{depth}
+    объекта data{depth} по дереву схемы. Имена атрибутов (с заменой
+    ключевых слов) вычисляются здесь, один раз.
+    """
+    keys = f'_keys_{len(namespace)}'
+    namespace[keys] = frozenset(tree)
+    lines.append(f'{indent}found{depth} = 0')
+    for key, subtree in tree.items():
+        name = key + "_" if keyword.iskeyword(key) else key
+        value = f'value{depth}'
+        node = f'node{depth}'
+        lines += [f'{indent}{value} = data{depth}.get({key!r}, _MISSING)',
+                  f'{indent}if {value} is not _MISSING:',
+                  f'{indent}    found{depth} += 1',
+                  f'{indent}    if type({value}) in _SCALARS:']
+        if depth == 0 and key == 'price':
+            lines += [f'{indent}        if {value} < 0:',
+                      f'{indent}            raise ValueError('
+                      f'"Price must be >= 0")']
+        lines += [f'{indent}        {node} = _new(_Value)',
+                  f'{indent}        {node}.value = {value}']
+        if subtree:
+            inner = depth + 1
+            lines += [f'{indent}    elif type({value}) is dict:',
+                      f'{indent}        {node} = _new(_JSONConverter)',
+                      f'{indent}        attributes{inner} = {node}.__dict__',
+                      f'{indent}        data{inner} = {value}']
+            _compile_object(subtree, inner, lines, namespace,
+                            indent + '        ')
+        lines += [f'{indent}    elif type({value}) is list:',
+                  f'{indent}        {node} = _list_node({value})',
+                  f'{indent}    else:',
+                  f'{indent}        {node} = _JSONConverter({value})',
+                  f'{indent}    attributes{depth}[{name!r}] = {node}']
+    lines += [f'{indent}if found{depth} < len(data{depth}):',
+              f'{indent}    _convert_rest(attributes{depth}, data{depth}, '
+              f'{keys})']
+
+
+def compile_advert_class(fields: Iterable[str] = ADVERT_SCHEMA,
+                         name: str = 'SchemaAdvert') -> type:
+    """
+    Компилирует схему объявления в подкласс Advert со специальным
+    конструктором. Код конструктора генерируется один раз: имена
+    атрибутов (включая замену class на class_) уже подставлены,
+    поля присваиваются напрямую, а проверка цены выполняется
+    при разборе, без hasattr. Объявления, не совпадающие со схемой,
+    создаются так же, как Advert: лишние поля и значения другой формы
+    разбираются обычным путём.
+
+    :param fields: поля схемы (вложенные через точку).
+    :param name: имя создаваемого класса.
+    :return: подкласс Advert.
+    """
+    fields = tuple(fields)
+    namespace = {'_MISSING': _MISSING, '_SCALARS': _SCALARS,
+                 '_new': object.__new__, '_JSONConverter': JSONConverter,
+                 '_Value': _Value,
+                 '_list_node': _list_node, '_convert_rest': _convert_rest}
+    lines = ['def __init__(self, data0, lazy=False):',
+             '    attributes0 = self.__dict__']
+    _compile_object(_schema_tree(fields), 0, lines, namespace, '    ')
+    lines += ["    price0 = data0.get('price', _MISSING)",
+              '    if price0 is _MISSING:',
+              '        node0 = _new(_Value)',
+              '        node0.value = 0',
+              "        attributes0['price'] = node0",
+              '    elif type(price0) not in _SCALARS:',
+              '        self._validate_price()']
+    exec('\n'.join(lines), namespace)
+    init = namespace['__init__']
+    init.__module__ = __name__
+    init.__qualname__ = f'{name}.__init__'
+    init = instrument(init)
+    return type(name, (Advert,),
+                {'__init__': init, '__module__': __name__,
+                 '__qualname__': name, 'schema': fields},
+                repr_color_code=Advert.repr_color_code)
+
+
+SchemaAdvert = compile_advert_class(ADVERT_SCHEMA, 'SchemaAdvert')
+
+
+def render_adverts(adverts: Iterable[Advert],
+                   stream: Optional[TextIO] = None,
+                   color: Optional[bool] = None):
+    """
+    Выводит объявления в поток одной буферизованной записью,
+    по объявлению на строку.
+
+    :param adverts: объявления.
+    :param stream: поток вывода (по умолчанию sys.stdout).
+    :param color: раскрашивать ли текст; по умолчанию - только если
+    поток является терминалом.
+    """
+    if stream is None:
+        stream = sys.stdout
+    if color is None:
+        isatty = getattr(stream, 'isatty', None)
+        color = bool(isatty and isatty())
+    lines = [advert.render(color) for advert in adverts]
+    if lines:
+        lines.append('')
+        stream.write('\n'.join(lines))
+
+
 if __name__ == "__main__":
     pass
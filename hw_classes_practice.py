@@ -1,5 +1,197 @@
-from typing import List
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from functools import lru_cache
+import copy
 import math
+import re
+import zlib
+
+from instrumentation import instrument
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Движок для tf_transform, idf_transform и TF-IDF: 'numpy' (если NumPy
+# установлен) или 'python'. Результаты обоих движков совпадают побитово.
+BACKEND = 'numpy' if np is not None else 'python'
+
+
+def _use_numpy() -> bool:
+    return np is not None and BACKEND == 'numpy'
+
+
+class CSRMatrix:
+    """
+    A sparse matrix in compressed sparse row (CSR) format.
+    Only non-zero values are stored, so memory scales with
+    the number of non-zeros rather than rows x columns.
+
+    The component arrays may also be read-only memoryviews
+    (e.g. over a memory-mapped file, see vectorizer_io).
+
+    Attributes:
+        indptr (array): Offsets into indices/data; row i occupies
+        positions indptr[i]:indptr[i + 1].
+        indices (array): Column index of each stored value,
+        sorted within a row.
+        data (array): Stored values.
+        n_cols (int): Number of columns.
+    """
+
+    def __init__(self, indptr: array, indices: array, data: array,
+                 n_cols: int):
+        """
+        Initializes a CSRMatrix from its component arrays.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_cols = n_cols
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """
+        Returns the (rows, columns) shape of the matrix.
+        """
+        return len(self.indptr) - 1, self.n_cols
+
+    @property
+    def nnz(self) -> int:
+        """
+        Returns the number of stored values.
+        """
+        return len(self.data)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def __repr__(self) -> str:
+        return f'CSRMatrix(shape={self.shape}, nnz={self.nnz})'
+
+    def iter_rows(self) -> Iterator[Tuple[array, array]]:
+        """
+        Iterates over rows as (column indices, values) pairs.
+        """
+        indptr = self.indptr
+        for ind_doc in range(len(indptr) - 1):
+            start, end = indptr[ind_doc], indptr[ind_doc + 1]
+            yield self.indices[start:end], self.data[start:end]
+
+    def toarray(self) -> List[list]:
+        """
+        Converts the matrix to a dense list of lists.
+
+        Returns:
+            result (list): The dense matrix.
+        """
+        typecode = (self.data.typecode if isinstance(self.data, array)
+                    else self.data.format)
+        zero = 0.0 if typecode in 'fd' else 0
+        result = []
+        for indices, values in self.iter_rows():
+            row = [zero] * self.n_cols
+            for ind_word, value in zip(indices, values):
+                row[ind_word] = value
+            result.append(row)
+        return result
+
+
+class Tokenizer:
+    """
+    A configurable tokenizer pipeline: split into tokens, normalise
+    (lowercase) and drop stop words, then build word or character n-grams.
+    Normalised tokens are kept in an LRU cache, so frequent words
+    are normalised only once.
+
+    Attributes:
+        token_pattern (str): A regular expression matching one token;
+        None splits on whitespace like str.split().
+        lowercase (bool): Whether tokens are lowercased.
+        stop_words (frozenset): Normalised tokens to drop.
+        ngram_range (tuple): The minimal and maximal n-gram length.
+        analyzer (str): 'word' for word n-grams, 'char' for character
+        n-grams of the normalised text.
+        cache_size (int): The size of the LRU cache of normalised tokens.
+    """
+
+    def __init__(self, token_pattern: Optional[str] = None,
+                 lowercase: bool = True,
+                 stop_words: Optional[Iterable[str]] = None,
+                 ngram_range: Tuple[int, int] = (1, 1),
+                 analyzer: str = 'word', cache_size: int = 2 ** 16):
+        """
+        Initializes a Tokenizer object and compiles its pattern.
+        """
+        if analyzer not in ('word', 'char'):
+            raise ValueError(f'Unknown analyzer: {analyzer}')
+        if not 1 <= ngram_range[0] <= ngram_range[1]:
+            raise ValueError(f'Invalid ngram_range: {ngram_range}')
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.stop_words = frozenset(stop_words or ())
+        self.ngram_range = tuple(ngram_range)
+        self.analyzer = analyzer
+        self.cache_size = cache_size
+        self._compile()
+
+    def _compile(self):
+        """
+        Compiles the token pattern and creates the normalisation cache.
+        """
+        self._split = (re.compile(self.token_pattern).findall
+                       if self.token_pattern is not None else str.split)
+        self._normalize = lru_cache(maxsize=self.cache_size)(
+            self._normalize_token)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state['_split'], state['_normalize']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._compile()
+
+    def _normalize_token(self, token: str) -> Optional[str]:
+        """
+        Returns the normalised token or None for a stop word.
+        """
+        if self.lowercase:
+            token = token.lower()
+        return None if token in self.stop_words else token
+
+    def _ngrams(self, items, joiner: str) -> List[str]:
+        """
+        Returns all n-grams of the items within ngram_range.
+        """
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return list(items)
+        ngrams = list(items) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            ngrams.extend(joiner.join(items[start:start + n])
+                          for start in range(len(items) - n + 1))
+        return ngrams
+
+    def __call__(self, doc: str) -> List[str]:
+        """
+        Splits a document into tokens (or n-grams).
+
+        Args:
+            doc (str): The text document.
+
+        Returns:
+            tokens (list): The tokens of the document.
+        """
+        if self.analyzer == 'char':
+            return self._ngrams(doc.lower() if self.lowercase else doc, '')
+        normalize = self._normalize
+        tokens = [token for token in map(normalize, self._split(doc))
+                  if token is not None]
+        return self._ngrams(tokens, ' ')
 
 
 class CountVectorizer:
@@ -11,17 +203,213 @@ class CountVectorizer:
         vocab (dict): A dictionary that maps each unique word
         in the documents to an integer index.
         feature_names (list): A list of the unique words in the documents.
+        document_frequency (list): The number of fitted documents
+        containing each word.
+        n_documents (int): The number of fitted documents.
     """
 
-    def __init__(self):
+    def __init__(self, sparse: bool = False, n_jobs: int = 1,
+                 tokenizer: Optional[Tokenizer] = None):
         """
         Initializes a CountVectorizer object with
         an empty vocabulary and feature_names list.
+
+        Args:
+            sparse (bool): Whether fit_transform and transform return
+            a CSRMatrix instead of a dense list of lists.
+            n_jobs (int): The number of processes used to tokenise
+            and count documents when fitting.
+            tokenizer (Tokenizer): The tokenizer pipeline; by default
+            documents are split on whitespace and lowercased.
+        """
+        self.sparse = sparse
+        self.n_jobs = n_jobs
+        self.tokenizer = tokenizer if tokenizer is not None else Tokenizer()
+        self._reset()
+
+    def _reset(self):
+        """
+        Forgets the fitted vocabulary and document frequencies.
         """
         self.vocab = {}
         self.feature_names = []
+        self.document_frequency = []
+        self.n_documents = 0
+
+    def _make_mutable(self):
+        """
+        Copies a read-only fit (e.g. the memory-mapped vocabulary
+        and document frequencies of vectorizer_io.load_vectorizer)
+        into a dict and lists, so that it can be updated.
+        """
+        if not isinstance(self.feature_names, list):
+            self.feature_names = list(self.feature_names)
+        if not isinstance(self.vocab, dict):
+            self.vocab = {word: ind_word for ind_word, word
+                          in enumerate(self.feature_names)}
+        if not isinstance(self.document_frequency, list):
+            self.document_frequency = list(self.document_frequency)
 
-    def fit_transform(self, documents: List[str]) -> List[List[int]]:
+    def _count(self, documents: Iterable[str], update: bool,
+               build: bool = True) -> Optional[CSRMatrix]:
+        """
+        Tokenises every document once and counts its words.
+
+        Args:
+            documents (iterable): Strings representing the text documents.
+            update (bool): Whether unseen words are added to the vocabulary
+            and document frequencies are updated; otherwise unseen words
+            are ignored.
+            build (bool): Whether to build and return the count matrix.
+
+        Returns:
+            result (CSRMatrix or None): The sparse matrix of token counts.
+        """
+        if update:
+            self._make_mutable()
+        if update and self.n_jobs > 1:
+            return self._count_parallel(documents, build)
+        vocab = self.vocab
+        document_frequency = self.document_frequency
+        indptr = array('q', [0])
+        indices = array('i')
+        data = array('q')
+        for doc in documents:
+            counts = {}
+            for word in self.tokenizer(doc):
+                ind_word = vocab.get(word)
+                if ind_word is None:
+                    if not update:
+                        continue
+                    ind_word = vocab[word] = len(vocab)
+                    self.feature_names.append(word)
+                    document_frequency.append(0)
+                counts[ind_word] = counts.get(ind_word, 0) + 1
+            if update:
+                self.n_documents += 1
+                for ind_word in counts:
+                    document_frequency[ind_word] += 1
+            if build:
+                for ind_word in sorted(counts):
+                    indices.append(ind_word)
+                    data.append(counts[ind_word])
+                indptr.append(len(indices))
+        if not build:
+            return None
+        return CSRMatrix(indptr, indices, data, len(vocab))
+
+    def _count_parallel(self, documents: Iterable[str],
+                        build: bool) -> Optional[CSRMatrix]:
+        """
+        Counts documents in a process pool. The corpus is split into
+        contiguous shards, each shard gets its own vocabulary and counts,
+        and the shards are merged in order: new words get global indices
+        in the same first-seen order as a serial fit, and shard rows are
+        remapped to those indices without counting again.
+
+        Args:
+            documents (iterable): Strings representing the text documents.
+            build (bool): Whether to build and return the count matrix.
+
+        Returns:
+            result (CSRMatrix or None): The sparse matrix of token counts.
+        """
+        documents = list(documents)
+        n_shards = min(len(documents), self.n_jobs * 4) or 1
+        shard_size = max(1, -(-len(documents) // n_shards))
+        template = copy.copy(self)
+        template.n_jobs = 1
+        template._reset()
+        tasks = [(template, documents[start:start + shard_size], build)
+                 for start in range(0, len(documents), shard_size)]
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            shards = executor.map(_count_shard, tasks)
+            indptr = array('q', [0])
+            indices = array('i')
+            data = array('q')
+            for shard, shard_matrix in shards:
+                mapping = array('i')
+                for word, all_count_word in zip(shard.feature_names,
+                                                shard.document_frequency):
+                    ind_word = self.vocab.get(word)
+                    if ind_word is None:
+                        ind_word = self.vocab[word] = len(self.vocab)
+                        self.feature_names.append(word)
+                        self.document_frequency.append(0)
+                    self.document_frequency[ind_word] += all_count_word
+                    mapping.append(ind_word)
+                self.n_documents += shard.n_documents
+                if not build:
+                    continue
+                if np is not None:
+                    _append_remapped_numpy(indptr, indices, data,
+                                           shard_matrix, mapping)
+                    continue
+                for row_indices, row_data in shard_matrix.iter_rows():
+                    for ind_word, count in sorted(
+                            zip([mapping[index] for index in row_indices],
+                                row_data)):
+                        indices.append(ind_word)
+                        data.append(count)
+                    indptr.append(len(indices))
+        if not build:
+            return None
+        return CSRMatrix(indptr, indices, data, len(self.vocab))
+
+    def _output(self, count_matrix: CSRMatrix) \
+            -> Union[List[List[int]], CSRMatrix]:
+        """
+        Returns the count matrix in the configured (sparse or dense) form.
+        """
+        return count_matrix if self.sparse else count_matrix.toarray()
+
+    def fit(self, documents: Iterable[str]) -> 'CountVectorizer':
+        """
+        Learns the vocabulary of the given documents,
+        discarding any previously fitted vocabulary.
+
+        Args:
+            documents (iterable): Strings representing the text documents.
+
+        Returns:
+            self (CountVectorizer): The fitted vectorizer.
+        """
+        self._reset()
+        return self.partial_fit(documents)
+
+    def partial_fit(self, documents: Iterable[str]) -> 'CountVectorizer':
+        """
+        Updates the vocabulary and document frequencies with a batch
+        of documents, keeping what was learned from previous batches.
+        No count matrix is built, so memory per batch stays constant.
+
+        Args:
+            documents (iterable): Strings representing the text documents.
+
+        Returns:
+            self (CountVectorizer): The fitted vectorizer.
+        """
+        self._count(documents, update=True, build=False)
+        return self
+
+    @instrument
+    def transform(self, documents: Iterable[str]) \
+            -> Union[List[List[int]], CSRMatrix]:
+        """
+        Counts words of the given documents using the fitted vocabulary.
+        Words outside the vocabulary are ignored.
+
+        Args:
+            documents (iterable): Strings representing the text documents.
+
+        Returns:
+            result (list or CSRMatrix): The matrix of token counts.
+        """
+        return self._output(self._count(documents, update=False))
+
+    @instrument
+    def fit_transform(self, documents: List[str]) \
+            -> Union[List[List[int]], CSRMatrix]:
         """
         Fits the CountVectorizer object to the given collection
         of documents and returns a matrix of token counts.
@@ -31,28 +419,12 @@ class CountVectorizer:
             the text documents.
 
         Returns:
-            result (list): A list of lists representing
-            the matrix of token counts for each document.
+            result (list or CSRMatrix): A list of lists (or a sparse
+            matrix if sparse=True) representing the matrix of token counts
+            for each document.
         """
-        docs = []
-        for doc in documents:
-            words = doc.split()
-            words = [word.lower() for word in words]
-            docs.append(words)
-
-        for doc in docs:
-            for word in doc:
-                if word not in self.vocab:
-                    self.vocab[word] = len(self.vocab)
-                    self.feature_names.append(word)
-        result = []
-        for doc in docs:
-            vector = [0] * len(self.vocab)
-            for word in doc:
-                if word in self.vocab:
-                    vector[self.vocab[word]] += 1
-            result.append(vector)
-        return result
+        self._reset()
+        return self._output(self._count(documents, update=True))
 
     def get_feature_names(self):
         """
@@ -64,50 +436,427 @@ class CountVectorizer:
         return self.feature_names
 
 
-def tf_transform(count_matrix: List[List[int]]) -> List[List[float]]:
+def _count_shard(task: Tuple['CountVectorizer', List[str], bool]) \
+        -> Tuple['CountVectorizer', Optional[CSRMatrix]]:
     """
-    Данная функция нормализует значения в count_matrix.
+    Fits an empty vectorizer on one shard of the corpus.
+    Runs in a worker process of CountVectorizer._count_parallel.
 
     Args:
-        count_matrix (list): Матрица количества слов в каждом документе
+        task (tuple): An unfitted vectorizer, the shard documents and
+        whether to build the count matrix.
 
     Returns:
-        tf_matrix (list): Матрица частоты встречаемости
+        result (tuple): The fitted shard vectorizer and its count matrix.
+    """
+    vectorizer, documents, build = task
+    return vectorizer, vectorizer._count(documents, update=True, build=build)
+
+
+def _append_remapped_numpy(indptr: array, indices: array, data: array,
+                           shard_matrix: CSRMatrix, mapping: array):
+    """
+    Appends the rows of a shard count matrix to CSR arrays, replacing
+    shard column indices with global ones and re-sorting every row
+    with a single lexsort.
+
+    Args:
+        indptr, indices, data (array): The CSR arrays being built.
+        shard_matrix (CSRMatrix): The shard count matrix.
+        mapping (array): The global index of each shard column.
+    """
+    shard_indptr = np.frombuffer(shard_matrix.indptr, dtype=np.int64)
+    if len(shard_matrix.indices):
+        lengths = np.diff(shard_indptr)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        global_indices = np.frombuffer(mapping, dtype=np.intc)[
+            np.frombuffer(shard_matrix.indices, dtype=np.intc)]
+        order = np.lexsort((global_indices, rows))
+        shard_data = np.frombuffer(shard_matrix.data, dtype=np.int64)
+        offset = len(indices)
+        indices.frombytes(global_indices[order].tobytes())
+        data.frombytes(shard_data[order].tobytes())
+    else:
+        offset = len(indices)
+    indptr.frombytes((shard_indptr[1:] + offset).tobytes())
+
+
+class HashingVectorizer:
+    """
+    A stateless vectorizer that maps words to a fixed number of columns
+    with a stable hash (CRC32) instead of a stored vocabulary.
+    Because nothing is learned, independent processes produce
+    identical columns. The output can be passed to tfidf_transform.
+
+    Attributes:
+        n_features (int): The number of columns (hash buckets).
+        alternate_sign (bool): Whether a second hash bit chooses
+        the sign of each count, so that colliding words tend to cancel
+        out instead of accumulating.
+        sparse (bool): Whether transform returns a CSRMatrix
+        instead of a dense list of lists.
+        tokenizer (Tokenizer): The tokenizer pipeline.
+    """
+
+    def __init__(self, n_features: int = 2 ** 20,
+                 alternate_sign: bool = True, sparse: bool = True,
+                 tokenizer: Optional[Tokenizer] = None):
+        """
+        Initializes a HashingVectorizer object.
+        """
+        self.n_features = n_features
+        self.alternate_sign = alternate_sign
+        self.sparse = sparse
+        self.tokenizer = tokenizer if tokenizer is not None else Tokenizer()
+
+    def _bucket(self, word: str) -> Tuple[int, int]:
+        """
+        Returns the column and the sign of a word.
+        """
+        hashed = zlib.crc32(word.encode('utf-8'))
+        sign = -1 if self.alternate_sign and hashed & 0x80000000 else 1
+        return hashed % self.n_features, sign
+
+    def fit(self, documents: Optional[Iterable[str]] = None) \
+            -> 'HashingVectorizer':
+        """
+        Does nothing: the vectorizer is stateless.
+
+        Returns:
+            self (HashingVectorizer): The vectorizer.
+        """
+        return self
+
+    partial_fit = fit
+
+    @instrument
+    def transform(self, documents: Iterable[str]) \
+            -> Union[List[List[int]], CSRMatrix]:
+        """
+        Returns the hashed matrix of token counts.
+        Columns whose signed counts cancel out are not stored.
+
+        Args:
+            documents (iterable): Strings representing the text documents.
+
+        Returns:
+            result (list or CSRMatrix): The matrix of hashed token counts.
+        """
+        indptr = array('q', [0])
+        indices = array('i')
+        data = array('q')
+        for doc in documents:
+            counts = {}
+            for word in self.tokenizer(doc):
+                ind_word, sign = self._bucket(word)
+                counts[ind_word] = counts.get(ind_word, 0) + sign
+            for ind_word in sorted(counts):
+                if counts[ind_word]:
+                    indices.append(ind_word)
+                    data.append(counts[ind_word])
+            indptr.append(len(indices))
+        count_matrix = CSRMatrix(indptr, indices, data, self.n_features)
+        return count_matrix if self.sparse else count_matrix.toarray()
+
+    fit_transform = transform
+
+
+@instrument
+def tf_transform(count_matrix: Union[List[List[int]], CSRMatrix]) \
+        -> Union[List[List[float]], CSRMatrix]:
+    """
+    Данная функция нормализует значения в count_matrix
+    (делит их на сумму модулей значений документа, что для обычных
+    неотрицательных счётчиков совпадает с длиной документа).
+    Входная матрица не изменяется.
+
+    Args:
+        count_matrix (list or CSRMatrix): Матрица количества слов
+        в каждом документе
+
+    Returns:
+        tf_matrix (list or CSRMatrix): Матрица частоты встречаемости
         каждого слова в документе.
     """
-    tf_matrix = count_matrix.copy()
-    for ind_doc, doc in enumerate(tf_matrix):
-        length_doc = sum(doc)
-        for ind_word, word in enumerate(doc):
-            tf_matrix[ind_doc][ind_word] = word / length_doc
+    if _use_numpy():
+        return _tf_transform_numpy(count_matrix)
+    if isinstance(count_matrix, CSRMatrix):
+        return _tf_transform_sparse(count_matrix)
+    tf_matrix = []
+    for doc in count_matrix:
+        length_doc = sum(map(abs, doc)) or 1
+        tf_matrix.append([word / length_doc for word in doc])
     return tf_matrix
 
 
-def idf_transform(count_matrix: List[List[int]]) -> List[float]:
+def _tf_transform_sparse(count_matrix: CSRMatrix) -> CSRMatrix:
+    """
+    tf_transform для разреженной матрицы: делит только ненулевые
+    значения на длину документа.
+    """
+    indptr = count_matrix.indptr
+    counts = count_matrix.data
+    data = array('d', bytes(8 * len(counts)))
+    for ind_doc in range(len(indptr) - 1):
+        start, end = indptr[ind_doc], indptr[ind_doc + 1]
+        length_doc = sum(map(abs, counts[start:end]))
+        for position in range(start, end):
+            data[position] = counts[position] / length_doc
+    return CSRMatrix(indptr, count_matrix.indices, data, count_matrix.n_cols)
+
+
+def _tf_transform_numpy(count_matrix: Union[List[List[int]], CSRMatrix]) \
+        -> Union[List[List[float]], CSRMatrix]:
+    """
+    tf_transform на NumPy: длины документов и деление считаются
+    векторно. Целые счётчики точно представимы во float64, поэтому
+    результат совпадает с чистым Python.
+    """
+    if isinstance(count_matrix, CSRMatrix):
+        counts = np.frombuffer(count_matrix.data,
+                               dtype=_matrix_typecode(count_matrix.data))
+        lengths = np.diff(np.frombuffer(count_matrix.indptr, dtype=np.int64))
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        length_docs = np.bincount(rows, weights=np.abs(counts),
+                                  minlength=len(lengths))
+        data = array('d')
+        data.frombytes((counts / length_docs[rows]).tobytes())
+        return CSRMatrix(count_matrix.indptr, count_matrix.indices, data,
+                         count_matrix.n_cols)
+    if len(count_matrix) == 0:
+        return []
+    counts = np.asarray(count_matrix, dtype=np.float64)
+    length_docs = np.abs(counts).sum(axis=1, keepdims=True)
+    length_docs[length_docs == 0] = 1
+    return (counts / length_docs).tolist()
+
+
+def _idf_values(total_documents: int, document_frequency) -> List[float]:
+    """
+    Compute IDF values from document frequencies. With NumPy the
+    logarithm is taken once per distinct frequency via math.log,
+    so the values are identical to the pure-Python path.
+
+    Args:
+    total_documents (int): The number of documents.
+    document_frequency (list or np.ndarray): The number of documents
+    containing each term.
+
+    Returns:
+    idf_matrix: A list containing the IDF value for each term.
+    """
+    if np is not None and isinstance(document_frequency, np.ndarray):
+        distinct, inverse = np.unique(document_frequency,
+                                      return_inverse=True)
+        values = np.array(
+            [math.log((total_documents + 1) / (all_count_word + 1)) + 1
+             for all_count_word in distinct.tolist()], dtype=np.float64)
+        return values[inverse].tolist()
+    return [math.log((total_documents + 1) / (all_count_word + 1)) + 1
+            for all_count_word in document_frequency]
+
+
+@instrument
+def idf_transform(count_matrix: Union[List[List[int]], CSRMatrix]) \
+        -> List[float]:
     """
     Calculate the Inverse Document Frequency (IDF)
     for each term in the count_matrix.
 
     Args:
-    count_matrix (list): The count matrix where each row represents
-    a document and each column represents a term.
+    count_matrix (list or CSRMatrix): The count matrix where each row
+    represents a document and each column represents a term.
 
     Returns:
     idf_matrix: A list containing the IDF value for each term
     in the count_matrix.
     """
 
+    if _use_numpy():
+        return _idf_transform_numpy(count_matrix)
+    if isinstance(count_matrix, CSRMatrix):
+        return _idf_transform_sparse(count_matrix)
+
     total_documents = len(count_matrix)
     idf_matrix = []
 
     for ind_word, word_count in enumerate(count_matrix[0]):
         all_count_word = sum([1 for ind_doc, doc in enumerate(count_matrix)
-                              if count_matrix[ind_doc][ind_word] > 0])
+                              if count_matrix[ind_doc][ind_word] != 0])
         idf = math.log((total_documents + 1) / (all_count_word + 1)) + 1
         idf_matrix.append(idf)
     return idf_matrix
 
 
+def _idf_transform_sparse(count_matrix: CSRMatrix) -> List[float]:
+    """
+    idf_transform for a sparse matrix: document frequencies are counted
+    in one pass over the stored column indices.
+    """
+    total_documents = len(count_matrix)
+    document_frequency = [0] * count_matrix.n_cols
+    for ind_word in count_matrix.indices:
+        document_frequency[ind_word] += 1
+    return _idf_values(total_documents, document_frequency)
+
+
+def _idf_transform_numpy(count_matrix: Union[List[List[int]], CSRMatrix]) \
+        -> List[float]:
+    """
+    idf_transform with NumPy: document frequencies are computed
+    as a single batched array operation.
+    """
+    if isinstance(count_matrix, CSRMatrix):
+        document_frequency = np.bincount(
+            np.frombuffer(count_matrix.indices, dtype=np.intc),
+            minlength=count_matrix.n_cols)
+    else:
+        document_frequency = (np.asarray(count_matrix) != 0).sum(axis=0)
+    return _idf_values(len(count_matrix), document_frequency)
+
+
+def _matrix_typecode(data) -> str:
+    """
+    Returns the array typecode of CSR data (an array or a memoryview).
+    """
+    return data.typecode if isinstance(data, array) else data.format
+
+
+def _float_buffer(counts, dtype: str, inplace: bool):
+    """
+    Returns the buffer TF-IDF values are written to: a new zeroed
+    array, or with inplace=True the storage of counts itself
+    (reinterpreted as floats if the counts are integers).
+    """
+    if not inplace:
+        return array(dtype, bytes(array(dtype).itemsize * len(counts)))
+    if isinstance(counts, array) and counts.typecode == dtype:
+        return counts
+    view = memoryview(counts).cast('B')
+    if len(view) < array(dtype).itemsize * len(counts):
+        raise ValueError(f'Cannot store {dtype!r} values in place of '
+                         f'{_matrix_typecode(counts)!r} values')
+    return view.cast(dtype)[:len(counts)]
+
+
+def _tfidf_sparse(count_matrix: CSRMatrix, idf_matrix: List[float],
+                  dtype: str, inplace: bool) -> CSRMatrix:
+    """
+    Fused TF-IDF for a sparse matrix: every stored count is normalised
+    and weighted in a single pass straight into the output buffer.
+    Every value is read before its slot in the buffer is written,
+    so the buffer may share storage with the counts. Counts are read
+    through a memoryview, so row slices are not copied.
+    """
+    indptr = count_matrix.indptr
+    indices = count_matrix.indices
+    counts = memoryview(count_matrix.data)
+    data = _float_buffer(count_matrix.data, dtype, inplace)
+    for ind_doc in range(len(indptr) - 1):
+        start, end = indptr[ind_doc], indptr[ind_doc + 1]
+        length_doc = sum(map(abs, counts[start:end])) or 1
+        for position in range(start, end):
+            data[position] = counts[position] / length_doc \
+                * idf_matrix[indices[position]]
+    return CSRMatrix(indptr, indices, data, count_matrix.n_cols)
+
+
+def _tfidf_sparse_numpy(count_matrix: CSRMatrix, idf_matrix: List[float],
+                        dtype: str, inplace: bool) -> CSRMatrix:
+    """
+    Fused TF-IDF for a sparse matrix with NumPy. Values are computed
+    in float64 (as the pure-Python path does) and cast on store.
+    This needs temporary arrays, so it is only used for inplace=False.
+    """
+    indptr = count_matrix.indptr
+    indices = count_matrix.indices
+    counts = np.frombuffer(count_matrix.data,
+                           dtype=_matrix_typecode(count_matrix.data))
+    lengths = np.diff(np.frombuffer(indptr, dtype=np.int64))
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    length_docs = np.bincount(rows, weights=np.abs(counts),
+                              minlength=len(lengths))
+    length_docs[length_docs == 0] = 1
+    values = counts / length_docs[rows]
+    values *= np.asarray(idf_matrix, dtype=np.float64)[
+        np.frombuffer(indices, dtype=np.intc)]
+    data = _float_buffer(count_matrix.data, dtype, inplace)
+    if len(data):
+        np.frombuffer(data, dtype=dtype)[:] = values
+    return CSRMatrix(indptr, indices, data, count_matrix.n_cols)
+
+
+def _tfidf_dense(count_matrix: List[List[int]], idf_matrix: List[float],
+                 inplace: bool) -> List[List[float]]:
+    """
+    Fused TF-IDF for a dense matrix: one new row per document,
+    or with inplace=True the rows of count_matrix are overwritten
+    element by element.
+    """
+    if _use_numpy() and len(count_matrix) and not inplace:
+        counts = np.asarray(count_matrix, dtype=np.float64)
+        length_docs = np.abs(counts).sum(axis=1, keepdims=True)
+        length_docs[length_docs == 0] = 1
+        values = counts / length_docs
+        values *= np.asarray(idf_matrix, dtype=np.float64)
+        return values.tolist()
+    tfidf_matrix = count_matrix if inplace else []
+    for doc in count_matrix:
+        length_doc = sum(map(abs, doc)) or 1
+        if inplace:
+            for ind_word, word in enumerate(doc):
+                doc[ind_word] = word / length_doc * idf_matrix[ind_word]
+        else:
+            tfidf_matrix.append([word / length_doc * idf
+                                 for word, idf in zip(doc, idf_matrix)])
+    return tfidf_matrix
+
+
+@instrument
+def tfidf_transform(count_matrix: Union[List[List[int]], CSRMatrix],
+                    idf_matrix: Optional[List[float]] = None,
+                    dtype: str = 'f',
+                    inplace: bool = False) \
+        -> Union[List[List[float]], CSRMatrix]:
+    """
+    Turn any count matrix (e.g. the output of HashingVectorizer)
+    into a TF-IDF matrix. TF normalisation and IDF weighting are done
+    in one pass that writes every value once.
+
+    By default count_matrix is left untouched: a sparse result gets
+    a new data buffer (sharing indptr and indices with the input)
+    and a dense result gets new rows. With inplace=True no buffer
+    or row is allocated and the result is written over the input
+    instead: dense rows are overwritten, and sparse integer counts are
+    reinterpreted as a float buffer (a memoryview over the input data),
+    so count_matrix must not be used afterwards. In-place results are
+    always computed by the pure-Python loop, since the NumPy backend
+    needs temporary arrays.
+
+    Args:
+    count_matrix (list or CSRMatrix): The count matrix.
+    idf_matrix (list): Precomputed IDF values; computed from
+    count_matrix when omitted.
+    dtype (str): The storage of sparse results: 'f' (float32,
+    the default) or 'd' (float64). Dense rows hold Python floats,
+    which float32 would not make smaller, so they are always
+    computed at full precision and dtype is ignored for them.
+    inplace (bool): Whether to write the result over count_matrix.
+
+    Returns:
+    tfidf_matrix (list or CSRMatrix): The TF-IDF matrix.
+    """
+    if dtype not in ('f', 'd'):
+        raise ValueError(f"dtype must be 'f' or 'd', not {dtype!r}")
+    if idf_matrix is None:
+        idf_matrix = idf_transform(count_matrix)
+    if not isinstance(count_matrix, CSRMatrix):
+        return _tfidf_dense(count_matrix, idf_matrix, inplace)
+    if _use_numpy() and not inplace:
+        return _tfidf_sparse_numpy(count_matrix, idf_matrix, dtype, inplace)
+    return _tfidf_sparse(count_matrix, idf_matrix, dtype, inplace)
+
+
 class TfidfTransformer(CountVectorizer):
     """
     A class for transforming a count matrix into a TF-IDF matrix.
@@ -117,11 +866,98 @@ class TfidfTransformer(CountVectorizer):
     of text documents into a matrix of token counts.
 
     Methods:
+    fit: Learn the vocabulary and idf.
+    partial_fit: Update the vocabulary and idf with a batch of documents.
+    transform: Transform documents using the fitted vocabulary and idf.
     fit_transform: Transform the count matrix into a TF-IDF matrix.
     """
 
+    def __init__(self, sparse: bool = False, n_jobs: int = 1,
+                 tokenizer: Optional[Tokenizer] = None, dtype: str = 'f'):
+        """
+        Args:
+        sparse, n_jobs, tokenizer: See CountVectorizer.
+        dtype (str): The storage of sparse TF-IDF values:
+        'f' (float32, the default) or 'd' (float64). Dense output
+        (sparse=False) is always computed at full precision.
+        """
+        if dtype not in ('f', 'd'):
+            raise ValueError(f"dtype must be 'f' or 'd', not {dtype!r}")
+        super().__init__(sparse, n_jobs, tokenizer)
+        self.dtype = dtype
+
+    def _reset(self):
+        super()._reset()
+        self.idf = []
+
+    def _tfidf(self, count_matrix: CSRMatrix) \
+            -> Union[List[List[float]], CSRMatrix]:
+        """
+        Returns the TF-IDF matrix of a count matrix in the configured
+        form. Only sparse output is stored as dtype; dense rows are
+        Python floats, so they are computed in float64.
+        """
+        dtype = self.dtype if self.sparse else 'd'
+        return self._output(tfidf_transform(count_matrix, self.idf, dtype))
+
+    def _update_idf(self):
+        """
+        Recompute the idf from the fitted document frequencies
+        (the same values idf_transform gives for the fitted count matrix).
+        """
+        self.idf = _idf_values(self.n_documents, self.document_frequency)
+
+    def fit(self, raw_documents: Iterable[str]) -> 'TfidfTransformer':
+        """
+        Learn the vocabulary and idf, discarding any previous fit.
+
+        Args:
+        raw_documents (iterable): Strings where each string
+        represents a document.
+
+        Returns:
+        self (TfidfTransformer): The fitted transformer.
+        """
+        super().fit(raw_documents)
+        self._update_idf()
+        return self
+
+    def partial_fit(self, raw_documents: Iterable[str]) \
+            -> 'TfidfTransformer':
+        """
+        Update the vocabulary, document frequencies and idf
+        with a batch of documents.
+
+        Args:
+        raw_documents (iterable): Strings where each string
+        represents a document.
+
+        Returns:
+        self (TfidfTransformer): The fitted transformer.
+        """
+        super().partial_fit(raw_documents)
+        self._update_idf()
+        return self
+
+    def transform(self, raw_documents: Iterable[str]) \
+            -> Union[List[List[float]], CSRMatrix]:
+        """
+        Return the TF-IDF matrix of the documents using the fitted
+        vocabulary and idf. Words outside the vocabulary are ignored.
+
+        Args:
+        raw_documents (iterable): Strings where each string
+        represents a document.
+
+        Returns:
+        tfidf_matrix (list or CSRMatrix): The TF-IDF matrix representing
+        the input documents.
+        """
+        count_matrix = self._count(raw_documents, update=False)
+        return self._tfidf(count_matrix)
+
     def fit_transform(self, raw_documents: List[List[str]]) \
-            -> List[List[float]]:
+            -> Union[List[List[float]], CSRMatrix]:
         """
         Learn the vocabulary and idf from the count_matrix
         and return the TF-IDF matrix.
@@ -131,21 +967,15 @@ class TfidfTransformer(CountVectorizer):
         where each string represents a document.
 
         Returns:
-        tfidf_matrix (list): The TF-IDF matrix representing
-        the input documents.
+        tfidf_matrix (list or CSRMatrix): The TF-IDF matrix representing
+        the input documents (sparse if the transformer was created
+        with sparse=True).
         """
 
-        count_matrix = super().fit_transform(raw_documents)
-        idf_matrix = idf_transform(count_matrix)
-        tf_matrix = tf_transform(count_matrix)
-
-        tfidf_matrix = tf_matrix.copy()
-
-        for ind_doc, doc in enumerate(tf_matrix):
-            for ind_word, word in enumerate(doc):
-                tfidf_matrix[ind_doc][ind_word] = \
-                    tf_matrix[ind_doc][ind_word] * idf_matrix[ind_word]
-        return tfidf_matrix
+        self._reset()
+        count_matrix = self._count(raw_documents, update=True)
+        self._update_idf()
+        return self._tfidf(count_matrix)
 
 
 class TfidfVectorizer:
@@ -157,14 +987,63 @@ class TfidfVectorizer:
     None
 
     Methods:
+    fit: Learn the vocabulary and idf.
+    partial_fit: Update the vocabulary and idf with a batch of documents.
+    transform: Transform documents using the fitted vocabulary and idf.
     fit_transform: Transform the input documents into a TF-IDF matrix.
     """
 
-    def __init__(self):
-        self.transformer = TfidfTransformer()
+    def __init__(self, sparse: bool = False, n_jobs: int = 1,
+                 tokenizer: Optional[Tokenizer] = None, dtype: str = 'f'):
+        self.transformer = TfidfTransformer(sparse, n_jobs, tokenizer, dtype)
+
+    def fit(self, raw_documents: Iterable[str]) -> 'TfidfVectorizer':
+        """
+        Learn the vocabulary and idf, discarding any previous fit.
+
+        Args:
+        raw_documents (iterable): Strings where each string
+        represents a document.
+
+        Returns:
+        self (TfidfVectorizer): The fitted vectorizer.
+        """
+        self.transformer.fit(raw_documents)
+        return self
+
+    def partial_fit(self, raw_documents: Iterable[str]) \
+            -> 'TfidfVectorizer':
+        """
+        Update the vocabulary and idf with a batch of documents.
+
+        Args:
+        raw_documents (iterable): Strings where each string
+        represents a document.
+
+        Returns:
+        self (TfidfVectorizer): The fitted vectorizer.
+        """
+        self.transformer.partial_fit(raw_documents)
+        return self
+
+    @instrument
+    def transform(self, raw_documents: Iterable[str]) \
+            -> Union[List[List[float]], CSRMatrix]:
+        """
+        Transform documents using the fitted vocabulary and idf.
+
+        Args:
+        raw_documents (iterable): Strings where each string
+        represents a document.
+
+        Returns:
+        list or CSRMatrix: The TF-IDF matrix representing the documents.
+        """
+        return self.transformer.transform(raw_documents)
 
+    @instrument
     def fit_transform(self, raw_documents: List[List[str]]) \
-            -> List[List[float]]:
+            -> Union[List[List[float]], CSRMatrix]:
         """
         Transform the input documents into a TF-IDF matrix.
 
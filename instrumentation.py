@@ -0,0 +1,202 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Union
+
+# OMD_PROFILE=1 включает замеры времени, OMD_PROFILE=memory - ещё и памяти;
+# OMD_PROFILE_OUTPUT - файл, куда результаты выгружаются при выходе.
+_MODE = os.environ.get('OMD_PROFILE', '').strip().lower()
+ENABLED = _MODE not in ('', '0', 'false', 'no', 'off')
+MEMORY = _MODE == 'memory'
+_BUCKETS = 40
+
+
+class CallStats:
+    """
+    Статистика вызовов одной функции: число вызовов, суммарное
+    и максимальное время, гистограммы времени (корзины по степеням
+    двойки микросекунд) и пик памяти по tracemalloc.
+    """
+
+    __slots__ = ('calls', 'wall_total', 'wall_max', 'cpu_total',
+                 'wall_histogram', 'cpu_histogram', 'memory_peak')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_total = 0.0
+        self.wall_max = 0.0
+        self.cpu_total = 0.0
+        self.wall_histogram = array('q', bytes(8 * _BUCKETS))
+        self.cpu_histogram = array('q', bytes(8 * _BUCKETS))
+        self.memory_peak = 0
+
+    def record(self, wall: float, cpu: float, memory: int = 0):
+        """
+        Добавляет в статистику один вызов.
+
+        :param wall: астрономическое время вызова в секундах.
+        :param cpu: процессорное время вызова в секундах.
+        :param memory: пик памяти вызова в байтах.
+        """
+        self.calls += 1
+        self.wall_total += wall
+        self.cpu_total += cpu
+        if wall > self.wall_max:
+            self.wall_max = wall
+        self.wall_histogram[_bucket(wall)] += 1
+        self.cpu_histogram[_bucket(cpu)] += 1
+        if memory > self.memory_peak:
+            self.memory_peak = memory
+
+    def as_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'wall_total': self.wall_total,
+            'wall_mean': self.wall_total / self.calls if self.calls else 0.0,
+            'wall_max': self.wall_max,
+            'cpu_total': self.cpu_total,
+            'wall_histogram_us': _histogram(self.wall_histogram),
+            'cpu_histogram_us': _histogram(self.cpu_histogram),
+            'memory_peak': self.memory_peak
+        }
+
+
+def _bucket(seconds: float) -> int:
+    return min(int(seconds * 1e6).bit_length(), _BUCKETS - 1)
+
+
+def _histogram(counts: array) -> Dict[str, int]:
+    """
+    Гистограмма в виде {верхняя граница в микросекундах: число вызовов}.
+    """
+    return {f'<{1 << bucket}': count
+            for bucket, count in enumerate(counts) if count}
+
+
+_stats: Dict[str, CallStats] = {}
+_lock = threading.Lock()
+
+
+def _record(name: str, wall: float, cpu: float, memory: int = 0):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = CallStats()
+        stats.record(wall, cpu, memory)
+
+
+def _start_memory() -> int:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    return current
+
+
+def _memory_peak(start: int) -> int:
+    _, peak = tracemalloc.get_traced_memory()
+    return max(peak - start, 0)
+
+
+def instrument(function: Optional[Callable] = None, *,
+               name: Optional[str] = None,
+               memory: Optional[bool] = None
+               ) -> Union[Callable, Callable[[Callable], Callable]]:
+    """
+    Декоратор, записывающий статистику вызовов функции.
+    Если замеры выключены (переменная окружения OMD_PROFILE не задана
+    при импорте), функция возвращается без изменений, так что
+    в выключенном состоянии накладных расходов нет.
+    Можно использовать как @instrument и как @instrument(name=...).
+
+    :param function: декорируемая функция.
+    :param name: имя в статистике (по умолчанию - модуль и имя функции).
+    :param memory: замерять пик памяти (по умолчанию - если
+    OMD_PROFILE=memory); вложенные замеры памяти сбрасывают пик
+    внешних, так что память лучше мерить на верхнем уровне.
+    :return: обёртка или декоратор.
+    """
+    def decorator(function: Callable) -> Callable:
+        if not ENABLED:
+            return function
+        key = name or f'{function.__module__}.{function.__qualname__}'
+        trace_memory = MEMORY if memory is None else memory
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start_memory = _start_memory() if trace_memory else 0
+            started_cpu = time.process_time()
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                wall = time.perf_counter() - started
+                cpu = time.process_time() - started_cpu
+                _record(key, wall, cpu,
+                        _memory_peak(start_memory) if trace_memory else 0)
+        return wrapper
+
+    if function is not None:
+        return decorator(function)
+    return decorator
+
+
+@contextmanager
+def measure(name: str, memory: Optional[bool] = None):
+    """
+    Контекстный менеджер, записывающий статистику блока кода
+    под именем name. При выключенных замерах ничего не делает.
+
+    :param name: имя в статистике.
+    :param memory: замерять пик памяти (см. instrument).
+    """
+    if not ENABLED:
+        yield
+        return
+    trace_memory = MEMORY if memory is None else memory
+    start_memory = _start_memory() if trace_memory else 0
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - started_cpu
+        _record(name, wall, cpu,
+                _memory_peak(start_memory) if trace_memory else 0)
+
+
+def report() -> Dict[str, dict]:
+    """
+    Возвращает собранную статистику по именам функций и блоков.
+    """
+    with _lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+def reset():
+    """
+    Очищает собранную статистику.
+    """
+    with _lock:
+        _stats.clear()
+
+
+def export(file_path: str):
+    """
+    Выгружает собранную статистику в JSON-файл.
+
+    :param file_path: путь к файлу.
+    """
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(report(), file, ensure_ascii=False, indent=2)
+
+
+if ENABLED and os.environ.get('OMD_PROFILE_OUTPUT'):
+    atexit.register(export, os.environ['OMD_PROFILE_OUTPUT'])
@@ -1,7 +1,28 @@
+import argparse
 import csv
-from typing import List, Dict, Tuple
+import io
+import mmap
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Union, Iterable, Iterator, Optional
 
+from department_index import (DepartmentIndex, LEVELS, report_columns,
+                              save_columnar, save_csv)
+from department_stats import (STATISTICS, DEFAULT_STATISTICS,
+                              get_extended_report)
+from instrumentation import instrument
+from report_cache import ReportCache
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNAR_EXTENSION = '.omdr'
+
+
+@instrument
 def read_csv(file_path: str) -> List[Dict[str, str]]:
     """
     Читает csv-файл и возвращает список словарей с данными о сотрудниках.
@@ -20,24 +41,233 @@ def read_csv(file_path: str) -> List[Dict[str, str]]:
         return data
 
 
+def iter_csv(file_paths: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """
+    Лениво читает csv-файлы и по одному возвращает словари с данными
+    о сотрудниках (те же, что у read_csv).
+    :param file_paths: пути к csv-файлам
+    :return: итератор словарей с данными о сотрудниках
+    """
+    for file_path in file_paths:
+        with open(file_path, newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile, delimiter=';')
+            header = next(reader)
+            for row in reader:
+                if row:
+                    yield dict(zip(header, row))
+
+
+class EmployeeTable:
+    """
+    Колоночное представление данных о сотрудниках.
+    Оклады и оценки хранятся в типизированных массивах, а департаменты,
+    отделы и должности закодированы целыми числами (коды выдаются
+    в порядке первого появления значения).
+    """
+
+    __slots__ = ('names', 'departments', 'teams', 'positions',
+                 'department_codes', 'team_codes', 'position_codes',
+                 'ratings', 'salaries', '_department_index', '_team_index',
+                 '_position_index')
+
+    def __init__(self, keep_names: bool = False):
+        """
+        Создаёт пустую таблицу.
+        :param keep_names: сохранять ли ФИО сотрудников
+        (для отчётов они не нужны и занимают больше всего памяти)
+        """
+        self.names = [] if keep_names else None
+        self.departments = []
+        self.teams = []
+        self.positions = []
+        self.department_codes = array('i')
+        self.team_codes = array('i')
+        self.position_codes = array('i')
+        self.ratings = array('d')
+        self.salaries = array('i')
+        self._department_index = {}
+        self._team_index = {}
+        self._position_index = {}
+
+    def __len__(self) -> int:
+        return len(self.salaries)
+
+    @staticmethod
+    def _encode(index: Dict[str, int], labels: List[str], value: str) -> int:
+        """
+        Возвращает код значения, при необходимости заводя новый.
+        :param index: словарь значение -> код
+        :param labels: список значений по кодам
+        :param value: кодируемое значение
+        :return: код значения
+        """
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(labels)
+            labels.append(value)
+        return code
+
+    def append(self, name: str, department: str, team: str, position: str,
+               rating: float, salary: int):
+        """
+        Добавляет в таблицу одного сотрудника.
+        """
+        if self.names is not None:
+            self.names.append(name)
+        self.department_codes.append(
+            self._encode(self._department_index, self.departments,
+                         department))
+        self.team_codes.append(
+            self._encode(self._team_index, self.teams, team))
+        self.position_codes.append(
+            self._encode(self._position_index, self.positions, position))
+        self.ratings.append(rating)
+        self.salaries.append(salary)
+
+    @classmethod
+    def from_records(cls, data: List[Dict[str, str]],
+                     keep_names: bool = False) -> 'EmployeeTable':
+        """
+        Строит таблицу по списку словарей, как его возвращает read_csv.
+        :param data: список словарей с данными о сотрудниках
+        :param keep_names: сохранять ли ФИО сотрудников
+        :return: колоночная таблица
+        """
+        table = cls(keep_names)
+        for employee in data:
+            table.append(employee['ФИО полностью'], employee['Департамент'],
+                         employee['Отдел'], employee['Должность'],
+                         float(employee['Оценка']), int(employee['Оклад']))
+        return table
+
+    def department_hierarchy(self) -> Dict[str, List[str]]:
+        """
+        Возвращает иерархию департаментов и команд
+        (как get_department_hierarchy).
+        :return: словарь с иерархией департаментов и команд
+        """
+        hierarchy = [{} for _ in self.departments]
+        for department_code, team_code in zip(self.department_codes,
+                                              self.team_codes):
+            hierarchy[department_code][team_code] = None
+        return {department: [self.teams[code] for code in hierarchy[index]]
+                for index, department in enumerate(self.departments)}
+
+    def department_report(
+            self
+    ) -> List[Tuple[str, int, Tuple[int, int], float]]:
+        """
+        Возвращает сводный отчёт по департаментам
+        (как get_department_report). При наличии NumPy группировка
+        выполняется векторно.
+        :return: список кортежей с данными о департаментах
+        """
+        if not self.salaries:
+            return []
+        if np is not None:
+            return self._department_report_numpy()
+        size = len(self.departments)
+        counts = [0] * size
+        totals = [0] * size
+        mins = [None] * size
+        maxs = [None] * size
+        for code, salary in zip(self.department_codes, self.salaries):
+            counts[code] += 1
+            totals[code] += salary
+            if mins[code] is None or salary < mins[code]:
+                mins[code] = salary
+            if maxs[code] is None or salary > maxs[code]:
+                maxs[code] = salary
+        return [(department, counts[code], (mins[code], maxs[code]),
+                 totals[code] / counts[code])
+                for code, department in enumerate(self.departments)]
+
+    def _department_report_numpy(
+            self
+    ) -> List[Tuple[str, int, Tuple[int, int], float]]:
+        """
+        Векторная версия department_report на NumPy.
+        :return: список кортежей с данными о департаментах
+        """
+        size = len(self.departments)
+        codes = np.frombuffer(self.department_codes, dtype=np.intc)
+        salaries = np.frombuffer(self.salaries, dtype=np.intc).astype(
+            np.int64)
+        counts = np.bincount(codes, minlength=size)
+        totals = np.zeros(size, dtype=np.int64)
+        np.add.at(totals, codes, salaries)
+        mins = np.full(size, np.iinfo(np.int64).max)
+        np.minimum.at(mins, codes, salaries)
+        maxs = np.full(size, np.iinfo(np.int64).min)
+        np.maximum.at(maxs, codes, salaries)
+        return [(department, int(counts[code]),
+                 (int(mins[code]), int(maxs[code])),
+                 int(totals[code]) / int(counts[code]))
+                for code, department in enumerate(self.departments)]
+
+
+@instrument
+def read_table(file_path: str, keep_names: bool = False) -> EmployeeTable:
+    """
+    Читает csv-файл сразу в колоночную таблицу, не создавая
+    словарь на каждого сотрудника.
+    :param file_path: путь к csv-файлу
+    :param keep_names: сохранять ли ФИО сотрудников
+    :return: колоночная таблица с данными о сотрудниках
+    """
+    table = EmployeeTable(keep_names)
+    with open(file_path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile, delimiter=';')
+        header = next(reader)
+        name_index = header.index('ФИО полностью')
+        department_index = header.index('Департамент')
+        team_index = header.index('Отдел')
+        position_index = header.index('Должность')
+        rating_index = header.index('Оценка')
+        salary_index = header.index('Оклад')
+        for row in reader:
+            table.append(row[name_index], row[department_index],
+                         row[team_index], row[position_index],
+                         float(row[rating_index]), int(row[salary_index]))
+    return table
+
+
+@instrument
 def get_department_hierarchy(
-        data: List[Dict[str, str]]
+        data: Union[List[Dict[str, str]], EmployeeTable]
 ) -> Dict[str, List[str]]:
     """
     Возвращает словарь, в котором ключами являются названия отделов,
     а значениями - списки команд, принадлежащих этим департаментам.
     :param data: список словарей с данными о сотрудниках
+    или колоночная таблица
     :return: словарь с иерархией департаментов и команд
     """
+    if isinstance(data, EmployeeTable):
+        return data.department_hierarchy()
     hierarchy = {}
     for employee in data:
-        department = employee['Департамент']
-        team = employee['Отдел']
-        if department not in hierarchy:
-            hierarchy[department] = [team]
-        elif team not in hierarchy[department]:
-            hierarchy[department].append(team)
-    return hierarchy
+        teams = hierarchy.get(employee['Департамент'])
+        if teams is None:
+            teams = hierarchy[employee['Департамент']] = {}
+        teams[employee['Отдел']] = None
+    return {department: list(teams)
+            for department, teams in hierarchy.items()}
+
+
+@instrument
+def get_department_index(
+        data: Union[Iterable[Dict[str, str]], EmployeeTable]
+) -> DepartmentIndex:
+    """
+    Строит индексированную иерархию департамент -> отдел -> должность
+    с агрегатами на каждом уровне.
+    :param data: словари с данными о сотрудниках или колоночная таблица
+    :return: индекс иерархии
+    """
+    if isinstance(data, EmployeeTable):
+        return DepartmentIndex.from_table(data)
+    return DepartmentIndex.from_records(data)
 
 
 def print_department_hierarchy(hierarchy: Dict[str, List[str]]):
@@ -51,36 +281,41 @@ def print_department_hierarchy(hierarchy: Dict[str, List[str]]):
             print(f'-- {team}')
 
 
-def get_department_report(
-        data: List[Dict[str, str]]
+def _update_department_stats(
+        departments: Dict[str, Dict[str, int]],
+        department: str,
+        salary: int):
+    """
+    Обновляет накопленную статистику департамента одной зарплатой.
+    :param departments: словарь со статистикой по департаментам
+    :param department: название департамента
+    :param salary: оклад сотрудника
+    """
+    stats = departments.get(department)
+    if stats is None:
+        departments[department] = {
+            'count': 1,
+            'min_salary': salary,
+            'max_salary': salary,
+            'total_salary': salary
+        }
+    else:
+        stats['count'] += 1
+        if salary < stats['min_salary']:
+            stats['min_salary'] = salary
+        if salary > stats['max_salary']:
+            stats['max_salary'] = salary
+        stats['total_salary'] += salary
+
+
+def _make_department_report(
+        departments: Dict[str, Dict[str, int]]
 ) -> List[Tuple[str, int, Tuple[int, int], float]]:
     """
-    Возвращает список кортежей с данными о департаментах.
-    Каждый кортеж содержит название департамента, численность,
-    вилку зарплат (минимальная и максимальная), среднюю зарплату.
-    :param data: список словарей с данными о сотрудниках
+    Собирает отчёт по департаментам из накопленной статистики.
+    :param departments: словарь со статистикой по департаментам
     :return: список кортежей с данными о департаментах
     """
-    departments = {}
-    for employee in data:
-        department = employee['Департамент']
-        if department not in departments:
-            departments[department] = {
-                'count': 1,
-                'min_salary': int(employee['Оклад']),
-                'max_salary': int(employee['Оклад']),
-                'total_salary': int(employee['Оклад'])
-            }
-        else:
-            departments[department]['count'] += 1
-            salary = int(employee['Оклад'])
-            departments[department]['min_salary'] = min(
-                departments[department]['min_salary'],
-                salary)
-            departments[department]['max_salary'] = max(
-                departments[department]['max_salary'],
-                salary)
-            departments[department]['total_salary'] += salary
     report = []
     for department, stats in departments.items():
         count = stats['count']
@@ -92,6 +327,404 @@ def get_department_report(
     return report
 
 
+@instrument
+def get_department_report(
+        data: Union[List[Dict[str, str]], EmployeeTable]
+) -> List[Tuple[str, int, Tuple[int, int], float]]:
+    """
+    Возвращает список кортежей с данными о департаментах.
+    Каждый кортеж содержит название департамента, численность,
+    вилку зарплат (минимальная и максимальная), среднюю зарплату.
+    :param data: список словарей с данными о сотрудниках
+    или колоночная таблица
+    :return: список кортежей с данными о департаментах
+    """
+    if isinstance(data, EmployeeTable):
+        return data.department_report()
+    departments = {}
+    for employee in data:
+        _update_department_stats(departments, employee['Департамент'],
+                                 int(employee['Оклад']))
+    return _make_department_report(departments)
+
+
+def _aggregate_rows(
+        rows: Iterable[List[str]],
+        department_index: int,
+        team_index: int,
+        salary_index: int,
+        hierarchy: Dict[str, Dict[str, None]],
+        departments: Dict[str, Dict[str, int]]):
+    """
+    Добавляет строки csv-файла в иерархию и статистику департаментов.
+    Команды департамента хранятся в словаре как упорядоченное множество.
+    :param rows: строки csv-файла без заголовка
+    :param department_index: номер столбца "Департамент"
+    :param team_index: номер столбца "Отдел"
+    :param salary_index: номер столбца "Оклад"
+    :param hierarchy: накапливаемая иерархия департаментов и команд
+    :param departments: накапливаемая статистика по департаментам
+    """
+    for row in rows:
+        if not row:
+            continue
+        department = row[department_index]
+        teams = hierarchy.get(department)
+        if teams is None:
+            teams = hierarchy[department] = {}
+        teams[row[team_index]] = None
+        _update_department_stats(departments, department,
+                                 int(row[salary_index]))
+
+
+def _merge_department_stats(
+        departments: Dict[str, Dict[str, int]],
+        partial: Dict[str, Dict[str, int]]):
+    """
+    Сливает частичную статистику по департаментам в общую.
+    :param departments: общая статистика по департаментам
+    :param partial: частичная статистика (например, одного куска файла)
+    """
+    for department, stats in partial.items():
+        total = departments.get(department)
+        if total is None:
+            departments[department] = dict(stats)
+        else:
+            total['count'] += stats['count']
+            total['min_salary'] = min(total['min_salary'],
+                                      stats['min_salary'])
+            total['max_salary'] = max(total['max_salary'],
+                                      stats['max_salary'])
+            total['total_salary'] += stats['total_salary']
+
+
+def _report_columns(header: List[str]) -> Tuple[int, int, int]:
+    """
+    Возвращает номера столбцов, нужных для отчётов.
+    :param header: заголовок csv-файла
+    :return: номера столбцов "Департамент", "Отдел" и "Оклад"
+    """
+    return (header.index('Департамент'), header.index('Отдел'),
+            header.index('Оклад'))
+
+
+@instrument
+def stream_department_summary(
+        file_path: str
+) -> Tuple[Dict[str, List[str]],
+           List[Tuple[str, int, Tuple[int, int], float]]]:
+    """
+    Читает csv-файл построчно и за один проход строит иерархию
+    департаментов и сводный отчёт по ним. Строки не сохраняются,
+    поэтому расход памяти зависит только от числа департаментов и команд,
+    а не от числа сотрудников.
+    :param file_path: путь к csv-файлу
+    :return: иерархия департаментов и список кортежей с данными
+    о департаментах (те же, что у get_department_hierarchy
+    и get_department_report)
+    """
+    hierarchy, departments = stream_department_state(file_path)
+    return hierarchy, _make_department_report(departments)
+
+
+@instrument
+def stream_department_state(
+        file_path: str
+) -> Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]]]:
+    """
+    Читает csv-файл построчно и возвращает иерархию департаментов
+    и накопленную статистику по ним (в том же виде, что
+    parallel_department_state, поэтому результат можно кешировать).
+    :param file_path: путь к csv-файлу
+    :return: иерархия департаментов и статистика по департаментам
+    """
+    hierarchy = {}
+    departments = {}
+    with open(file_path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile, delimiter=';')
+        columns = _report_columns(next(reader))
+        _aggregate_rows(reader, *columns, hierarchy, departments)
+    hierarchy = {department: list(teams)
+                 for department, teams in hierarchy.items()}
+    return hierarchy, departments
+
+
+def _split_csv(file_path: str, chunk_size: int) -> List[Tuple]:
+    """
+    Делит csv-файл на куски по границам строк.
+    Предполагается, что поля не содержат переводов строк.
+    :param file_path: путь к csv-файлу
+    :param chunk_size: примерный размер куска в байтах
+    :return: список заданий (путь, начало, конец, номера столбцов)
+    """
+    with open(file_path, 'rb') as csvfile:
+        header_line = csvfile.readline().decode('utf-8')
+        columns = _report_columns(
+            next(csv.reader([header_line], delimiter=';')))
+        size = os.fstat(csvfile.fileno()).st_size
+        tasks = []
+        start = csvfile.tell()
+        while start < size:
+            csvfile.seek(min(start + chunk_size, size))
+            csvfile.readline()
+            end = csvfile.tell()
+            tasks.append((file_path, start, end, columns))
+            start = end
+    return tasks
+
+
+def scan_department_state(
+        file_path: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        block_size: int = 16 * 1024 * 1024
+) -> Tuple[Dict[str, Dict[str, None]], Dict[str, Dict[str, int]]]:
+    """
+    Считает иерархию и статистику по департаментам, читая файл через mmap
+    без декодирования в текст. Строки режутся на поля прямо в байтах,
+    оклад разбирается из байтов, а названия департаментов и отделов
+    декодируются по одному разу в конце. Файл обрабатывается блоками
+    по block_size байт, поэтому память не зависит от размера файла.
+    Предполагается, что поля не содержат кавычек, ";" и переводов строк.
+    :param file_path: путь к csv-файлу
+    :param start: смещение начала обрабатываемых строк
+    (по умолчанию - сразу за заголовком)
+    :param end: смещение конца обрабатываемых строк
+    (по умолчанию - конец файла)
+    :param block_size: примерный размер блока в байтах
+    :return: иерархия департаментов и статистика по ним
+    """
+    hierarchy = {}
+    departments = {}
+    with open(file_path, 'rb') as csvfile, \
+            mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        header_end = buffer.find(b'\n')
+        if header_end == -1:
+            header_end = len(buffer)
+        header_line = buffer[:header_end]
+        newline = b'\r\n' if header_line.endswith(b'\r') else b'\n'
+        department_index, team_index, salary_index = _report_columns(
+            next(csv.reader([header_line.decode('utf-8')], delimiter=';')))
+        position = header_end + 1 if start is None else start
+        end = len(buffer) if end is None else end
+        while position < end:
+            block_end = min(position + block_size, end)
+            if block_end < end:
+                block_end = buffer.find(b'\n', block_end, end) + 1 or end
+            for line in buffer[position:block_end].split(newline):
+                if not line:
+                    continue
+                fields = line.split(b';')
+                department = fields[department_index]
+                salary = int(fields[salary_index])
+                stats = departments.get(department)
+                if stats is None:
+                    departments[department] = [1, salary, salary, salary]
+                    hierarchy[department] = {fields[team_index]: None}
+                    continue
+                stats[0] += 1
+                if salary < stats[1]:
+                    stats[1] = salary
+                if salary > stats[2]:
+                    stats[2] = salary
+                stats[3] += salary
+                hierarchy[department][fields[team_index]] = None
+            position = block_end
+    hierarchy = {department.decode('utf-8'): {team.decode('utf-8'): None
+                                              for team in teams}
+                 for department, teams in hierarchy.items()}
+    departments = {
+        department.decode('utf-8'): {
+            'count': count,
+            'min_salary': min_salary,
+            'max_salary': max_salary,
+            'total_salary': total_salary
+        }
+        for department, (count, min_salary, max_salary, total_salary)
+        in departments.items()
+    }
+    return hierarchy, departments
+
+
+def _aggregate_chunk(task: Tuple) -> Tuple[Dict[str, Dict[str, None]],
+                                           Dict[str, Dict[str, int]]]:
+    """
+    Считает частичные иерархию и статистику по одному куску файла.
+    Выполняется в отдельном процессе. Куски без кавычек разбираются
+    быстрым сканером scan_department_state, остальные - модулем csv.
+    :param task: задание (путь, начало, конец, номера столбцов)
+    :return: частичные иерархия и статистика по департаментам
+    """
+    file_path, start, end, columns = task
+    with open(file_path, 'rb') as csvfile, \
+            mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        quoted = buffer.find(b'"', start, end) != -1
+    if not quoted:
+        return scan_department_state(file_path, start, end)
+    with open(file_path, 'rb') as csvfile:
+        csvfile.seek(start)
+        chunk = csvfile.read(end - start).decode('utf-8')
+    hierarchy = {}
+    departments = {}
+    reader = csv.reader(io.StringIO(chunk, newline=''), delimiter=';')
+    _aggregate_rows(reader, *columns, hierarchy, departments)
+    return hierarchy, departments
+
+
+def parallel_department_state(
+        file_paths: List[str],
+        workers: int = 1,
+        chunk_size: int = 8 * 1024 * 1024
+) -> Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]]]:
+    """
+    Считает иерархию и статистику (численность, минимум, максимум
+    и сумму окладов) по нескольким csv-файлам, разбивая их на куски
+    и обрабатывая куски в пуле процессов. Частичные результаты сливаются
+    в порядке следования кусков, поэтому результат совпадает
+    с последовательной обработкой файлов.
+    :param file_paths: пути к csv-файлам
+    :param workers: число процессов (1 - без пула процессов)
+    :param chunk_size: примерный размер куска в байтах
+    :return: иерархия департаментов и статистика по ним
+    """
+    tasks = []
+    for file_path in file_paths:
+        tasks.extend(_split_csv(file_path, chunk_size))
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(_aggregate_chunk, tasks))
+    else:
+        partials = map(_aggregate_chunk, tasks)
+    hierarchy = {}
+    departments = {}
+    for partial_hierarchy, partial_departments in partials:
+        for department, teams in partial_hierarchy.items():
+            hierarchy.setdefault(department, {}).update(teams)
+        _merge_department_stats(departments, partial_departments)
+    hierarchy = {department: list(teams)
+                 for department, teams in hierarchy.items()}
+    return hierarchy, departments
+
+
+def parallel_department_summary(
+        file_paths: List[str],
+        workers: int = 1,
+        chunk_size: int = 8 * 1024 * 1024
+) -> Tuple[Dict[str, List[str]],
+           List[Tuple[str, int, Tuple[int, int], float]]]:
+    """
+    Строит иерархию и сводный отчёт по нескольким csv-файлам
+    в пуле процессов (см. parallel_department_state).
+    :param file_paths: пути к csv-файлам
+    :param workers: число процессов (1 - без пула процессов)
+    :param chunk_size: примерный размер куска в байтах
+    :return: иерархия департаментов и список кортежей с данными
+    о департаментах
+    """
+    hierarchy, departments = parallel_department_state(file_paths, workers,
+                                                       chunk_size)
+    return hierarchy, _make_department_report(departments)
+
+
+@instrument
+def parallel_department_report(
+        file_paths: List[str],
+        workers: int = 1
+) -> List[Tuple[str, int, Tuple[int, int], float]]:
+    """
+    Возвращает сводный отчёт по департаментам для нескольких csv-файлов,
+    посчитанный в пуле процессов (см. parallel_department_summary).
+    :param file_paths: пути к csv-файлам
+    :param workers: число процессов
+    :return: список кортежей с данными о департаментах
+    """
+    return parallel_department_summary(file_paths, workers)[1]
+
+
+def update_department_state(
+        file_path: str,
+        start: int,
+        end: int,
+        state: Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]]]
+) -> Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]]]:
+    """
+    Добавляет к сохранённым иерархии и статистике строки, дописанные
+    в конец csv-файла. Разбираются только байты [start, end).
+    Последняя строка без перевода строки, в которой меньше столбцов,
+    чем в заголовке (файл дописывается прямо сейчас), пропускается.
+    :param file_path: путь к csv-файлу
+    :param start: смещение, до которого файл уже был обработан
+    :param end: смещение конца файла
+    :param state: сохранённые иерархия департаментов и статистика по ним
+    :return: обновлённые иерархия и статистика
+    """
+    with open(file_path, 'rb') as csvfile:
+        header_line = csvfile.readline().decode('utf-8')
+        tail_start = end
+        tail = b''
+        while tail_start > start and b'\n' not in tail:
+            tail_start = max(start, tail_start - 4096)
+            csvfile.seek(tail_start)
+            tail = csvfile.read(end - tail_start)
+        if tail and not tail.endswith(b'\n'):
+            line = tail[tail.rfind(b'\n') + 1:]
+            if line.count(b';') < header_line.count(';'):
+                end -= len(line)
+    columns = _report_columns(next(csv.reader([header_line], delimiter=';')))
+    chunk_hierarchy, chunk_departments = _aggregate_chunk(
+        (file_path, start, end, columns))
+    hierarchy = {department: dict.fromkeys(teams)
+                 for department, teams in state[0].items()}
+    for department, teams in chunk_hierarchy.items():
+        hierarchy.setdefault(department, {}).update(teams)
+    departments = {department: dict(stats)
+                   for department, stats in state[1].items()}
+    _merge_department_stats(departments, chunk_departments)
+    hierarchy = {department: list(teams)
+                 for department, teams in hierarchy.items()}
+    return hierarchy, departments
+
+
+@instrument
+def cached_department_summary(
+        file_paths: List[str],
+        cache: ReportCache,
+        workers: int = 1,
+        stream: bool = False
+) -> Tuple[Dict[str, List[str]],
+           List[Tuple[str, int, Tuple[int, int], float]]]:
+    """
+    Строит иерархию и сводный отчёт по csv-файлам, беря статистику
+    каждого неизменившегося файла из кеша. Для файлов, в которые
+    с прошлого запуска только дописывали строки, разбираются
+    лишь новые строки.
+    :param file_paths: пути к csv-файлам
+    :param cache: кеш статистики по файлам
+    :param workers: число процессов для пересчёта изменившихся файлов
+    :param stream: пересчитывать изменившиеся файлы построчным чтением
+    (stream_department_state) вместо parallel_department_state
+    :return: иерархия департаментов и список кортежей с данными
+    о департаментах
+    """
+    if stream:
+        compute = stream_department_state
+    else:
+        def compute(path):
+            return parallel_department_state([path], workers)
+    hierarchy = {}
+    departments = {}
+    for file_path in file_paths:
+        file_hierarchy, file_departments = cache.get(
+            file_path, compute, update_department_state)
+        for department, teams in file_hierarchy.items():
+            hierarchy.setdefault(department, {}).update(
+                dict.fromkeys(teams))
+        _merge_department_stats(departments, file_departments)
+    hierarchy = {department: list(teams)
+                 for department, teams in hierarchy.items()}
+    return hierarchy, _make_department_report(departments)
+
+
 def print_department_report(
         report: List[Tuple[str, int, Tuple[int, int], float]]
 ):
@@ -106,43 +739,153 @@ def print_department_report(
         print(f'-- Средняя зарплата: {avg_salary}')
 
 
+def print_extended_report(report: List[Tuple[str, Dict[str, float]]]):
+    """
+    Выводит на экран расширенный отчёт по департаментам или командам.
+    :param report: список пар (название группы, словарь статистик)
+    """
+    names = {
+        'count': 'Численность',
+        'min': 'Минимальная зарплата',
+        'max': 'Максимальная зарплата',
+        'mean': 'Средняя зарплата',
+        'median': 'Медианная зарплата',
+        'p90': '90-й процентиль зарплаты',
+        'mean_rating': 'Средняя оценка',
+        'correlation': 'Корреляция зарплаты и оценки'
+    }
+    for group, stats in report:
+        print(f'{group}:')
+        for statistic, value in stats.items():
+            print(f'-- {names[statistic]}: {value}')
+
+
+@instrument
 def save_department_report(
         report: List[Tuple[str, int, Tuple[int, int], float]],
-        file_path: str):
+        file_path: str,
+        file_format: Optional[str] = None):
     """
-    Сохраняет сводный отчёт по департаментам в csv-файл.
+    Сохраняет сводный отчёт по департаментам в csv-файл
+    или в двоичный колоночный файл (см. department_index.save_columnar).
     :param report: список кортежей с данными о департаментах
-    :param file_path: путь к csv-файлу
+    :param file_path: путь к файлу
+    :param file_format: 'csv' или 'columnar'; по умолчанию определяется
+    по расширению файла (COLUMNAR_EXTENSION - колоночный формат)
+    """
+    save_report_columns(report_columns(report), file_path, file_format)
+
+
+def save_report_columns(columns: Dict[str, list], file_path: str,
+                        file_format: Optional[str] = None):
     """
-    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Департамент', 'Численность', 'Минимальная зарплата',
-                         'Максимальная зарплата', 'Средняя зарплата'])
-        for department, count, (min_salary, max_salary), avg_salary in report:
-            writer.writerow([department, count, min_salary, max_salary,
-                             avg_salary])
+    Сохраняет отчёт, заданный колонками, в csv или колоночный файл.
+    :param columns: словарь название колонки -> значения
+    :param file_path: путь к файлу
+    :param file_format: 'csv' или 'columnar'; по умолчанию определяется
+    по расширению файла
+    """
+    if file_format is None:
+        file_format = ('columnar' if file_path.endswith(COLUMNAR_EXTENSION)
+                       else 'csv')
+    if file_format == 'columnar':
+        save_columnar(columns, file_path)
+    elif file_format == 'csv':
+        save_csv(columns, file_path)
+    else:
+        raise ValueError(f'Unknown file format: {file_format}')
 
 
 if __name__ == '__main__':
-    file_path = 'Corp_Summary.csv'
-    data = read_csv(file_path)
+    parser = argparse.ArgumentParser(
+        description='Отчёты по департаментам компании')
+    parser.add_argument('file_paths', nargs='*', default=['Corp_Summary.csv'],
+                        help='пути к csv-файлам с данными о сотрудниках')
+    parser.add_argument('--stream', action='store_true',
+                        help='читать файл потоково, не загружая его целиком')
+    parser.add_argument('--columnar', action='store_true',
+                        help='хранить данные в колоночной таблице '
+                             '(кеш отчётов при этом не используется)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='число процессов для параллельного чтения')
+    parser.add_argument('--cache-dir', default='.report_cache',
+                        help='каталог кеша отчётов')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='не использовать кеш отчётов')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='очистить кеш отчётов перед запуском')
+    parser.add_argument('--stats', default=','.join(DEFAULT_STATISTICS),
+                        help='статистики расширенного отчёта через запятую: '
+                             + ', '.join(STATISTICS))
+    parser.add_argument('--exact-limit', type=int, default=10000,
+                        help='до какого размера группы квантили '
+                             'считаются точно')
+    args = parser.parse_args()
+    statistics = [statistic.strip() for statistic in args.stats.split(',')
+                  if statistic.strip()]
+    unknown = set(statistics) - set(STATISTICS)
+    if unknown:
+        parser.error(f'неизвестные статистики в --stats: '
+                     f'{", ".join(sorted(unknown))}')
+    data = None
+    hierarchy = None
+    report = None
+    index = None
+    cache = ReportCache(args.cache_dir)
+    if args.clear_cache:
+        cache.clear()
+    if not args.no_cache and not args.columnar:
+        hierarchy, report = cached_department_summary(
+            args.file_paths, cache, args.workers, args.stream)
+    elif args.workers > 1 or len(args.file_paths) > 1:
+        hierarchy, report = parallel_department_summary(args.file_paths,
+                                                        args.workers)
+    elif args.stream:
+        hierarchy, report = stream_department_summary(args.file_paths[0])
+    elif args.columnar:
+        data = read_table(args.file_paths[0])
+    else:
+        data = read_csv(args.file_paths[0])
     while True:
         print('Меню:')
         print('1. Вывести иерархию департаментов')
         print('2. Вывести сводный отчёт по департаментам')
-        print('3. Сохранить сводный отчёт в csv-файл')
+        print('3. Сохранить сводный отчёт в файл '
+              f'(csv или {COLUMNAR_EXTENSION})')
+        print('4. Вывести расширенный отчёт по департаментам')
+        print('5. Вывести расширенный отчёт по командам')
+        print('6. Сохранить отчёт по уровню иерархии в файл')
         print('0. Выход')
         choice = input('Выберите пункт меню: ')
         if choice == '1':
-            hierarchy = get_department_hierarchy(data)
+            if hierarchy is None:
+                hierarchy = get_department_hierarchy(data)
             print_department_hierarchy(hierarchy)
         elif choice == '2':
-            report = get_department_report(data)
+            if report is None:
+                report = get_department_report(data)
             print_department_report(report)
         elif choice == '3':
-            report = get_department_report(data)
+            if report is None:
+                report = get_department_report(data)
             file_path = input('Введите путь к файлу для сохранения отчёта: ')
             save_department_report(report, file_path)
+        elif choice in ('4', '5'):
+            rows = (data if isinstance(data, list)
+                    else iter_csv(args.file_paths))
+            print_extended_report(get_extended_report(
+                rows, statistics, 'department' if choice == '4' else 'team',
+                args.exact_limit))
+        elif choice == '6':
+            if index is None:
+                index = get_department_index(
+                    data if data is not None else iter_csv(args.file_paths))
+            level = input(f'Уровень ({", ".join(LEVELS)}): ').strip()
+            if level not in LEVELS:
+                print('Некорректный уровень')
+                continue
+            file_path = input('Введите путь к файлу для сохранения отчёта: ')
+            save_report_columns(index.report_columns(level), file_path)
         elif choice == '0':
             break
         else:
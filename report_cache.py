@@ -0,0 +1,338 @@
+import hashlib
+import os
+import struct
+from typing import Callable, Dict, List, Optional, Tuple
+
+DepartmentState = Tuple[Dict[str, List[str]], Dict[str, Dict[str, int]]]
+StateUpdate = Callable[[str, int, int, DepartmentState], DepartmentState]
+
+_MAGIC = b'OMDC'
+_VERSION = 3
+# magic, версия, размер и mtime_ns исходного файла, длина его начала
+# до конца последней полной строки (сохранённое состояние относится
+# только к этим строкам), хеш этого начала
+_HEADER = struct.Struct('<4sHQqQ32s')
+_LENGTH = struct.Struct('<I')
+_STATS = struct.Struct('<qqqq')
+
+
+def file_digest(file_path: str, block_size: int = 1024 * 1024) -> bytes:
+    """
+    Считает хеш содержимого файла (BLAKE2b, 32 байта).
+    :param file_path: путь к файлу
+    :param block_size: размер блока чтения в байтах
+    :return: хеш содержимого файла
+    """
+    return _prefix_digests(file_path, [os.path.getsize(file_path)],
+                           block_size)[0]
+
+
+def _prefix_digests(file_path: str, sizes: List[int],
+                    block_size: int = 1024 * 1024) -> List[bytes]:
+    """
+    За одно чтение считает хеши нескольких начальных отрезков файла.
+    :param file_path: путь к файлу
+    :param sizes: длины отрезков в байтах (по возрастанию)
+    :param block_size: размер блока чтения в байтах
+    :return: хеши отрезков
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    digests = []
+    position = 0
+    with open(file_path, 'rb') as file:
+        for size in sizes:
+            while position < size:
+                block = file.read(min(block_size, size - position))
+                if not block:
+                    break
+                digest.update(block)
+                position += len(block)
+            digests.append(digest.copy().digest())
+    return digests
+
+
+def _line_bounds(file_path: str, size: int,
+                 block_size: int = 64 * 1024) -> Tuple[int, int]:
+    """
+    Находит конец заголовка и конец последней полной строки файла.
+    :param file_path: путь к файлу
+    :param size: размер файла в байтах
+    :param block_size: размер блока чтения в байтах
+    :return: смещения сразу за первым и за последним переводом строки
+    (0, если переводов строки нет)
+    """
+    with open(file_path, 'rb') as file:
+        header_end = 0
+        while True:
+            block = file.read(block_size)
+            if not block:
+                return 0, 0
+            position = block.find(b'\n')
+            if position != -1:
+                header_end += position + 1
+                break
+            header_end += len(block)
+        end = size
+        while end > header_end:
+            start = max(header_end, end - block_size)
+            file.seek(start)
+            position = file.read(end - start).rfind(b'\n')
+            if position != -1:
+                return header_end, start + position + 1
+            end = start
+    return header_end, header_end
+
+
+def _pack_string(value: str) -> bytes:
+    """
+    Упаковывает строку как длину (uint32) и байты UTF-8.
+    """
+    encoded = value.encode('utf-8')
+    return _LENGTH.pack(len(encoded)) + encoded
+
+
+def _unpack_string(buffer: bytes, offset: int) -> Tuple[str, int]:
+    """
+    Распаковывает строку, упакованную _pack_string.
+    :return: строка и смещение сразу за ней
+    """
+    (length,) = _LENGTH.unpack_from(buffer, offset)
+    offset += _LENGTH.size
+    return buffer[offset:offset + length].decode('utf-8'), offset + length
+
+
+def pack_state(state: DepartmentState) -> bytes:
+    """
+    Упаковывает иерархию и статистику по департаментам в бинарный вид.
+    :param state: иерархия департаментов и статистика по ним
+    :return: упакованные данные
+    """
+    hierarchy, departments = state
+    parts = [_LENGTH.pack(len(departments))]
+    for department, stats in departments.items():
+        parts.append(_pack_string(department))
+        parts.append(_STATS.pack(stats['count'], stats['min_salary'],
+                                 stats['max_salary'], stats['total_salary']))
+        teams = hierarchy.get(department, [])
+        parts.append(_LENGTH.pack(len(teams)))
+        parts.extend(_pack_string(team) for team in teams)
+    return b''.join(parts)
+
+
+def unpack_state(buffer: bytes, offset: int = 0) -> DepartmentState:
+    """
+    Распаковывает данные, упакованные pack_state.
+    :param buffer: упакованные данные
+    :param offset: смещение начала данных
+    :return: иерархия департаментов и статистика по ним
+    """
+    hierarchy = {}
+    departments = {}
+    (size,) = _LENGTH.unpack_from(buffer, offset)
+    offset += _LENGTH.size
+    for _ in range(size):
+        department, offset = _unpack_string(buffer, offset)
+        count, min_salary, max_salary, total_salary = _STATS.unpack_from(
+            buffer, offset)
+        offset += _STATS.size
+        departments[department] = {
+            'count': count,
+            'min_salary': min_salary,
+            'max_salary': max_salary,
+            'total_salary': total_salary
+        }
+        (teams_size,) = _LENGTH.unpack_from(buffer, offset)
+        offset += _LENGTH.size
+        teams = []
+        for _ in range(teams_size):
+            team, offset = _unpack_string(buffer, offset)
+            teams.append(team)
+        hierarchy[department] = teams
+    return hierarchy, departments
+
+
+class ReportCache:
+    """
+    Кеш иерархии и статистики по департаментам для csv-файлов.
+    Запись привязана к пути, размеру, времени изменения и хешу
+    содержимого файла и хранится на диске в компактном бинарном виде.
+    Внутри одного процесса результаты дополнительно хранятся в памяти.
+    Если файл только дописывался с прошлого запуска (начало файла
+    совпадает по хешу с закешированным), можно досчитать только
+    добавленные строки; если файл был обрезан или переписан,
+    состояние считается заново. Сохраняется состояние только по
+    полным строкам: недописанная последняя строка разбирается заново
+    при каждом запуске, пока не будет дописана.
+    Если суммарный размер кеша превышает max_bytes, удаляются записи,
+    которые дольше всего не использовались.
+    """
+
+    def __init__(self, cache_dir: str = '.report_cache',
+                 max_bytes: int = 64 * 1024 * 1024):
+        """
+        :param cache_dir: каталог для файлов кеша
+        :param max_bytes: максимальный суммарный размер файлов кеша
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._memory = {}
+
+    def _entry_path(self, file_path: str) -> str:
+        """
+        Возвращает путь к файлу кеша для исходного файла.
+        """
+        name = hashlib.blake2b(file_path.encode('utf-8'),
+                               digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, name + '.bin')
+
+    def _read_entry(
+            self, file_path: str
+    ) -> Optional[Tuple[int, int, int, bytes, DepartmentState]]:
+        """
+        Читает запись кеша для исходного файла.
+        :return: размер, mtime_ns, длина полных строк, хеш и состояние
+        или None, если записи нет или она повреждена
+        """
+        try:
+            with open(self._entry_path(file_path), 'rb') as entry:
+                buffer = entry.read()
+            magic, version, size, mtime_ns, complete, digest = \
+                _HEADER.unpack_from(buffer)
+            if magic != _MAGIC or version != _VERSION:
+                return None
+            stored_path, offset = _unpack_string(buffer, _HEADER.size)
+            if stored_path != file_path:
+                return None
+            return (size, mtime_ns, complete, digest,
+                    unpack_state(buffer, offset))
+        except (OSError, struct.error, UnicodeDecodeError):
+            return None
+
+    def _write_entry(self, file_path: str, size: int, mtime_ns: int,
+                     complete: int, digest: bytes, state: DepartmentState):
+        """
+        Атомарно записывает запись кеша для исходного файла.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(file_path)
+        tmp_path = entry_path + '.tmp'
+        with open(tmp_path, 'wb') as entry:
+            entry.write(_HEADER.pack(_MAGIC, _VERSION, size, mtime_ns,
+                                     complete, digest))
+            entry.write(_pack_string(file_path))
+            entry.write(pack_state(state))
+        os.replace(tmp_path, entry_path)
+        self._evict(keep=entry_path)
+
+    def _evict(self, keep: str):
+        """
+        Удаляет самые старые записи, пока кеш не уложится в max_bytes.
+        :param keep: запись, которую удалять нельзя
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+
+    def get(self, file_path: str,
+            compute: Callable[[str], DepartmentState],
+            update: Optional[StateUpdate] = None) -> DepartmentState:
+        """
+        Возвращает иерархию и статистику для файла: из памяти, с диска,
+        досчитанные по дописанному концу файла функцией update
+        или посчитанные заново функцией compute.
+        :param file_path: путь к csv-файлу
+        :param compute: функция, считающая состояние по пути к файлу
+        :param update: функция (путь, начало, конец, состояние),
+        добавляющая к состоянию строки из байтов [начало, конец) файла
+        :return: иерархия департаментов и статистика по ним
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self._memory.get(file_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        entry = self._read_entry(file_path)
+        if entry is not None and entry[:2] == key and (
+                entry[2] == stat.st_size or update is not None):
+            os.utime(self._entry_path(file_path))
+            state = entry[4]
+            if entry[2] < stat.st_size:
+                state = update(file_path, entry[2], stat.st_size, state)
+        else:
+            state = self._refresh(file_path, stat, entry, compute, update)
+        self._memory[file_path] = (key, state)
+        return state
+
+    def _refresh(self, file_path: str, stat: os.stat_result,
+                 entry: Optional[Tuple[int, int, int, bytes,
+                                       DepartmentState]],
+                 compute: Callable[[str], DepartmentState],
+                 update: Optional[StateUpdate]) -> DepartmentState:
+        """
+        Пересчитывает состояние файла, по возможности досчитывая
+        сохранённую запись, и сохраняет новую запись.
+        В запись попадают только строки до последнего перевода строки:
+        недописанная последняя строка учитывается в результате, но
+        при следующем запуске разбирается заново, уже целиком.
+        """
+        size = stat.st_size
+        header_end, complete = _line_bounds(file_path, size)
+        if complete < size and (update is None or header_end == 0):
+            return compute(file_path)
+        reuse = entry is not None and entry[2] <= complete
+        digests = _prefix_digests(
+            file_path, [entry[2], complete] if reuse else [complete])
+        state = None
+        if reuse and digests[0] == entry[3]:
+            if entry[2] == complete:
+                state = entry[4]
+            elif update is not None:
+                state = update(file_path, entry[2], complete, entry[4])
+        if state is None:
+            if complete == size:
+                state = compute(file_path)
+            else:
+                state = update(file_path, header_end, complete, ({}, {}))
+        self._write_entry(file_path, size, stat.st_mtime_ns, complete,
+                          digests[-1], state)
+        if complete < size:
+            state = update(file_path, complete, size, state)
+        return state
+
+    def invalidate(self, file_path: str):
+        """
+        Удаляет запись кеша для файла из памяти и с диска.
+        :param file_path: путь к csv-файлу
+        """
+        file_path = os.path.abspath(file_path)
+        self._memory.pop(file_path, None)
+        try:
+            os.remove(self._entry_path(file_path))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """
+        Полностью очищает кеш.
+        """
+        self._memory.clear()
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.bin'):
+                os.remove(os.path.join(self.cache_dir, name))
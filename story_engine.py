@@ -0,0 +1,249 @@
+import asyncio
+import json
+import math
+import time
+from array import array
+from types import MappingProxyType
+from typing import (AsyncIterable, Callable, Dict, Iterable, List, Mapping,
+                    NamedTuple, Optional, Tuple, Union)
+
+Answers = Union[AsyncIterable[str], Iterable[str]]
+
+
+class StoryNode(NamedTuple):
+    """
+    Скомпилированный шаг истории.
+    name - имя шага, intro - текст шага вместе с подсказкой,
+    prompt - готовая подсказка с вариантами ответа,
+    transitions - вариант ответа -> (имя следующего шага, итог);
+    заполнено ровно одно из двух.
+    """
+    name: str
+    intro: str
+    prompt: str
+    transitions: Mapping[str, Tuple[Optional[str], Optional[str]]]
+
+
+class StoryGraph(NamedTuple):
+    """
+    Скомпилированная неизменяемая история: начальный шаг и таблица шагов.
+    """
+    start: str
+    nodes: Mapping[str, StoryNode]
+
+
+def compile_story(story: dict) -> StoryGraph:
+    """
+    Компилирует описание истории в неизменяемую таблицу переходов.
+    Подсказки с вариантами ответа форматируются здесь, один раз.
+
+    :param story: словарь со стартовым шагом (start) и шагами (nodes);
+    у шага есть текст (text), шаблон подсказки (prompt, необязателен)
+    и варианты ответа (options), каждый ведёт к следующему шагу
+    (next) или к итогу (outcome).
+    :return: скомпилированная история.
+    """
+    nodes = {}
+    for name, node in story['nodes'].items():
+        options = node['options']
+        if not options:
+            raise ValueError(f'Step {name} has no options')
+        transitions = {}
+        for option, action in options.items():
+            if ('next' in action) == ('outcome' in action):
+                raise ValueError(f'Option {option!r} of step {name} must '
+                                 f'have exactly one of next and outcome')
+            if 'next' in action and action['next'] not in story['nodes']:
+                raise ValueError(f'Option {option!r} of step {name} leads '
+                                 f'to unknown step {action["next"]}')
+            transitions[option] = (action.get('next'), action.get('outcome'))
+        template = node.get('prompt')
+        if template is None:
+            template = 'Выберите: ' + ', '.join(['{}'] * len(options))
+        prompt = template.format(*options)
+        nodes[name] = StoryNode(name, f"{node['text']}\n{prompt}", prompt,
+                                MappingProxyType(transitions))
+    if story['start'] not in nodes:
+        raise ValueError(f'Unknown start step {story["start"]}')
+    return StoryGraph(story['start'], MappingProxyType(nodes))
+
+
+def load_story(file_path: str) -> StoryGraph:
+    """
+    Загружает историю из JSON-файла и компилирует её.
+
+    :param file_path: путь к файлу.
+    :return: скомпилированная история.
+    """
+    with open(file_path, encoding='utf-8') as file:
+        return compile_story(json.load(file))
+
+
+class StorySession:
+    """
+    Состояние одного прохождения истории. Не выполняет ввод-вывод:
+    принимает ответы и возвращает текст, который нужно показать.
+    """
+
+    __slots__ = ('graph', 'node', 'outcome')
+
+    def __init__(self, graph: StoryGraph, start: Optional[str] = None):
+        """
+        :param graph: скомпилированная история.
+        :param start: начальный шаг (по умолчанию - из истории).
+        """
+        self.graph = graph
+        self.node = graph.nodes[start or graph.start]
+        self.outcome = None
+
+    @property
+    def finished(self) -> bool:
+        return self.outcome is not None
+
+    def answer(self, option: str) -> str:
+        """
+        Обрабатывает ответ на текущем шаге.
+
+        :param option: ответ пользователя.
+        :return: текст следующего шага, итог или повтор подсказки,
+        если такого варианта нет.
+        """
+        transition = self.node.transitions.get(option)
+        if transition is None:
+            return self.node.prompt
+        next_name, outcome = transition
+        if outcome is not None:
+            self.outcome = outcome
+            return outcome
+        self.node = self.graph.nodes[next_name]
+        return self.node.intro
+
+
+def _quantile(values: List[float], q: float) -> float:
+    """
+    Квантиль отсортированных значений с линейной интерполяцией
+    между соседними значениями.
+    """
+    position = q * (len(values) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class StoryMetrics:
+    """
+    Задержки обработки ответов по шагам истории (в секундах).
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, array] = {}
+
+    def record(self, step: str, seconds: float):
+        latencies = self.latencies.get(step)
+        if latencies is None:
+            latencies = self.latencies[step] = array('d')
+        latencies.append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Возвращает для каждого шага число ответов, среднюю, медианную,
+        99-процентильную и максимальную задержку.
+        """
+        result = {}
+        for step, latencies in self.latencies.items():
+            values = sorted(latencies)
+            result[step] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': _quantile(values, 0.5),
+                'p99': _quantile(values, 0.99),
+                'max': values[-1]
+            }
+        return result
+
+
+async def _aiter(answers: Answers):
+    if hasattr(answers, '__aiter__'):
+        async for answer in answers:
+            yield answer
+    else:
+        for answer in answers:
+            yield answer
+
+
+async def run_session(graph: StoryGraph, answers: Answers,
+                      write: Callable[[str], object] = print,
+                      metrics: Optional[StoryMetrics] = None,
+                      start: Optional[str] = None) -> Optional[str]:
+    """
+    Проводит одно прохождение истории с неблокирующим источником ответов.
+
+    :param graph: скомпилированная история.
+    :param answers: асинхронный (или обычный) итератор ответов.
+    :param write: функция вывода текста.
+    :param metrics: куда записывать задержки шагов.
+    :param start: начальный шаг (по умолчанию - из истории).
+    :return: итог истории или None, если ответы закончились раньше.
+    """
+    session = StorySession(graph, start)
+    write(session.node.intro)
+    async for option in _aiter(answers):
+        started = time.perf_counter()
+        step = session.node.name
+        output = session.answer(option.strip())
+        if metrics is not None:
+            metrics.record(step, time.perf_counter() - started)
+        write(output)
+        if session.finished:
+            return session.outcome
+    return None
+
+
+async def run_sessions(graph: StoryGraph, sources: Iterable[Answers],
+                       write: Optional[Callable[[int, str], object]] = None,
+                       metrics: Optional[StoryMetrics] = None,
+                       concurrency: int = 10000) -> List[Optional[str]]:
+    """
+    Параллельно проводит много независимых прохождений истории.
+
+    :param graph: скомпилированная история.
+    :param sources: источники ответов, по одному на прохождение.
+    :param write: функция вывода (номер прохождения, текст);
+    по умолчанию вывод отбрасывается.
+    :param metrics: куда записывать задержки шагов.
+    :param concurrency: сколько прохождений идёт одновременно.
+    :return: итоги прохождений в порядке источников.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(number: int, answers: Answers) -> Optional[str]:
+        if write is None:
+            def output(text):
+                return None
+        else:
+            def output(text):
+                return write(number, text)
+        async with semaphore:
+            return await run_session(graph, answers, output, metrics)
+
+    return await asyncio.gather(*(run(number, answers)
+                                  for number, answers in enumerate(sources)))
+
+
+def play(graph: StoryGraph, start: Optional[str] = None,
+         read: Callable[[], str] = input,
+         write: Callable[[str], object] = print) -> Optional[str]:
+    """
+    Проводит прохождение истории в консоли.
+
+    :param graph: скомпилированная история.
+    :param start: начальный шаг (по умолчанию - из истории).
+    :param read: функция чтения ответа.
+    :param write: функция вывода текста.
+    :return: итог истории.
+    """
+    def answers():
+        while True:
+            yield read()
+
+    return asyncio.run(run_session(graph, answers(), write, start=start))
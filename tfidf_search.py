@@ -0,0 +1,266 @@
+from array import array
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Tuple, Union
+import heapq
+import math
+import mmap
+import os
+import struct
+
+from hw_classes_practice import CSRMatrix, TfidfVectorizer
+from instrumentation import instrument
+from vectorizer_io import load_vectorizer, save_vectorizer
+
+_MAGIC = b'OMDS'
+_VERSION = 1
+# magic, version, number of documents, number of posting lists
+_HEADER = struct.Struct('<4sHQQ')
+# offset of the index block, stored in the last bytes of the file
+_FOOTER = struct.Struct('<Q')
+
+
+class PostingLists(Mapping):
+    """
+    A read-only term index -> (document ids, TF-IDF weights) mapping
+    over flat arrays in CSR layout: the postings of term t are
+    documents[indptr[t]:indptr[t + 1]] and the matching weights.
+    Lookups return memoryview slices, so nothing is copied.
+    """
+
+    def __init__(self, indptr: memoryview, documents: memoryview,
+                 weights: memoryview):
+        """
+        Args:
+        indptr (memoryview): The start of every posting list
+        (plus the end of the last one).
+        documents (memoryview): The document ids of all postings.
+        weights (memoryview): The TF-IDF weights of all postings.
+        """
+        self._indptr = indptr
+        self._documents = documents
+        self._weights = weights
+
+    def __getitem__(self, ind_word: int) -> Tuple[memoryview, memoryview]:
+        if not 0 <= ind_word < len(self._indptr) - 1:
+            raise KeyError(ind_word)
+        start, end = self._indptr[ind_word], self._indptr[ind_word + 1]
+        if start == end:
+            raise KeyError(ind_word)
+        return self._documents[start:end], self._weights[start:end]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __iter__(self) -> Iterator[int]:
+        indptr = self._indptr
+        return (ind_word for ind_word in range(len(indptr) - 1)
+                if indptr[ind_word] != indptr[ind_word + 1])
+
+
+class TfidfSearchIndex:
+    """
+    An inverted index over TF-IDF vectors for top-k cosine similarity
+    search. Every term keeps a posting list of (document, weight) pairs
+    and document norms are precomputed, so a query only touches
+    the postings of its own terms instead of every document.
+
+    Attributes:
+        vectorizer (TfidfVectorizer): The fitted vectorizer.
+        transformer (TfidfTransformer): The fitted transformer that
+        provides the vocabulary, idf and tokenizer for queries.
+        postings (dict or PostingLists): Maps a term index to a pair
+        of arrays (document ids, TF-IDF weights).
+        norms (array or memoryview): The Euclidean norm of every
+        document vector.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer,
+                 tfidf_matrix: Union[List[List[float]], CSRMatrix]):
+        """
+        Builds the index from a fitted vectorizer and its TF-IDF matrix.
+
+        Args:
+        vectorizer (TfidfVectorizer): The fitted vectorizer.
+        tfidf_matrix (list or CSRMatrix): The TF-IDF matrix returned
+        by the vectorizer.
+        """
+        self.vectorizer = vectorizer
+        self.transformer = vectorizer.transformer
+        if isinstance(tfidf_matrix, CSRMatrix):
+            rows = tfidf_matrix.iter_rows()
+        else:
+            rows = (([ind_word for ind_word, value in enumerate(row)
+                      if value],
+                     [value for value in row if value])
+                    for row in tfidf_matrix)
+        postings = {}
+        self.norms = array('d')
+        for ind_doc, (indices, values) in enumerate(rows):
+            for ind_word, value in zip(indices, values):
+                posting = postings.get(ind_word)
+                if posting is None:
+                    posting = postings[ind_word] = (array('i'), array('d'))
+                posting[0].append(ind_doc)
+                posting[1].append(value)
+            self.norms.append(math.sqrt(sum(value * value
+                                            for value in values)))
+        self.postings = postings
+
+    def __len__(self) -> int:
+        return len(self.norms)
+
+    def _query_vector(self, query: str) -> List[Tuple[int, float]]:
+        """
+        Computes the TF-IDF weights of the query terms
+        (as TfidfTransformer.transform would, but without a dense row).
+        """
+        vocab = self.transformer.vocab
+        counts = {}
+        for word in self.transformer.tokenizer(query):
+            ind_word = vocab.get(word)
+            if ind_word is not None:
+                counts[ind_word] = counts.get(ind_word, 0) + 1
+        length_query = sum(counts.values())
+        idf = self.transformer.idf
+        return [(ind_word, count / length_query * idf[ind_word])
+                for ind_word, count in counts.items()]
+
+    @instrument
+    def query(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Finds the k documents most similar to the query string.
+
+        Args:
+        query (str): The query text.
+        k (int): The number of documents to return.
+
+        Returns:
+        list: Pairs (document index, cosine similarity) sorted
+        by decreasing similarity; documents sharing no terms with
+        the query are not returned.
+        """
+        query_vector = self._query_vector(query)
+        query_norm = math.sqrt(sum(weight * weight
+                                   for _, weight in query_vector))
+        if not query_norm:
+            return []
+        scores = {}
+        for ind_word, weight in query_vector:
+            posting = self.postings.get(ind_word)
+            if posting is None:
+                continue
+            for ind_doc, value in zip(*posting):
+                scores[ind_doc] = scores.get(ind_doc, 0.0) + weight * value
+        norms = self.norms
+        return heapq.nlargest(
+            k, ((ind_doc, score / (query_norm * norms[ind_doc]))
+                for ind_doc, score in scores.items()),
+            key=lambda item: item[1])
+
+    def query_batch(self, queries: Iterable[str],
+                    k: int = 10) -> List[List[Tuple[int, float]]]:
+        """
+        Runs several queries against the index.
+
+        Args:
+        queries (iterable): The query texts.
+        k (int): The number of documents to return per query.
+
+        Returns:
+        list: The result of query() for every query.
+        """
+        return [self.query(query, k) for query in queries]
+
+    def save(self, path: str):
+        """
+        Saves the index to a file: the vectorizer in the format of
+        vectorizer_io.save_vectorizer (so the vocabulary, idf and
+        tokenizer needed for queries are kept), followed by the norms
+        and the posting lists as flat 8-byte aligned arrays in CSR
+        layout and the offset of that block. The file is written
+        next to path and then moved over it, so an index loaded
+        from path stays valid.
+
+        Args:
+        path (str): The file path.
+        """
+        indptr = array('q', [0])
+        documents = array('i')
+        weights = array('d')
+        for ind_word in range(max(self.postings, default=-1) + 1):
+            posting = self.postings.get(ind_word)
+            if posting is not None:
+                documents.extend(posting[0])
+                weights.extend(posting[1])
+            indptr.append(len(documents))
+        norms = array('d', self.norms)
+        temporary_path = f'{path}.tmp'
+        save_vectorizer(self.vectorizer, temporary_path)
+        with open(temporary_path, 'r+b') as file:
+            offset = file.seek(0, os.SEEK_END)
+            offset += -offset % 8
+            file.write(b'\0' * (offset - file.tell()))
+            file.write(_HEADER.pack(_MAGIC, _VERSION, len(norms),
+                                    len(indptr) - 1))
+            for part in (norms, indptr, documents, weights):
+                file.write(b'\0' * (-file.tell() % 8))
+                file.write(part.tobytes())
+            file.write(_FOOTER.pack(offset))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'TfidfSearchIndex':
+        """
+        Loads an index saved with save(). The file is memory-mapped:
+        the vectorizer is loaded with vectorizer_io.load_vectorizer
+        and the norms and posting lists are used in place.
+
+        Args:
+        path (str): The file path.
+
+        Returns:
+        TfidfSearchIndex: The loaded index.
+        """
+        vectorizer, _ = load_vectorizer(path)
+        if not isinstance(vectorizer, TfidfVectorizer):
+            raise TypeError(f'{path} does not contain a {cls.__name__}')
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (offset,) = _FOOTER.unpack_from(buffer, len(buffer) - _FOOTER.size)
+        if offset + _HEADER.size > len(buffer) - _FOOTER.size:
+            raise TypeError(f'{path} does not contain a {cls.__name__}')
+        magic, version, n_documents, n_terms = _HEADER.unpack_from(
+            buffer, offset)
+        if magic != _MAGIC or version != _VERSION:
+            raise TypeError(f'{path} does not contain a {cls.__name__}')
+        view = memoryview(buffer)
+        position = offset + _HEADER.size
+
+        def section(typecode: str, length: int) -> memoryview:
+            nonlocal position
+            position += -position % 8
+            start = position
+            position += struct.calcsize(typecode) * length
+            return view[start:position].cast(typecode)
+
+        norms = section('d', n_documents)
+        indptr = section('q', n_terms + 1)
+        documents = section('i', indptr[-1])
+        weights = section('d', indptr[-1])
+        index = cls.__new__(cls)
+        index.vectorizer = vectorizer
+        index.transformer = vectorizer.transformer
+        index.postings = PostingLists(indptr, documents, weights)
+        index.norms = norms
+        return index
+
+
+if __name__ == '__main__':
+    corpus = ['Crock Pot Pasta Never boil pasta again',
+              'Pasta Pomodoro Fresh ingredients Parmesan to taste',
+              'Fresh tomatoes and basil']
+
+    vectorizer = TfidfVectorizer(sparse=True)
+    index = TfidfSearchIndex(vectorizer, vectorizer.fit_transform(corpus))
+    print(index.query('fresh pasta', k=2))
+    print(index.query_batch(['boil', 'basil tomatoes']))
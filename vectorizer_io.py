@@ -0,0 +1,281 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple, Union
+import json
+import mmap
+import os
+import struct
+
+from hw_classes_practice import (CSRMatrix, CountVectorizer, TfidfVectorizer,
+                                 Tokenizer)
+
+_MAGIC = b'OMDV'
+_VERSION = 1
+# magic, version, flags, number of terms, number of fitted documents
+_HEADER = struct.Struct('<4sHHQQ')
+# offset and length of a section
+_SECTION = struct.Struct('<QQ')
+_SECTIONS = ('config', 'offsets', 'strings', 'order', 'positions', 'idf',
+             'document_frequency', 'indptr', 'indices', 'data')
+_TFIDF = 1
+_SPARSE = 2
+_MATRIX = 4
+_FLOAT_DATA = 8
+_FLOAT32_DATA = 16
+
+
+class MappedVocabulary(Mapping):
+    """
+    A read-only word -> index mapping over a memory-mapped sorted
+    string table. Lookups are binary searches over the table;
+    recently used words are cached.
+    """
+
+    def __init__(self, buffer: mmap.mmap, strings_start: int,
+                 offsets: memoryview, order: memoryview,
+                 positions: memoryview, cache_size: int = 2 ** 16):
+        """
+        Args:
+            buffer (mmap): The mapped file.
+            strings_start (int): The offset of the string table.
+            offsets (memoryview): The start of every sorted string
+            in the table (plus the end of the table).
+            order (memoryview): The feature index of every sorted string.
+            positions (memoryview): The sorted position of every feature.
+            cache_size (int): The size of the lookup cache.
+        """
+        self._buffer = buffer
+        self._strings_start = strings_start
+        self._offsets = offsets
+        self._order = order
+        self._positions = positions
+        self._lookup = lru_cache(maxsize=cache_size)(self._search)
+
+    def _string(self, position: int) -> bytes:
+        """
+        Returns the sorted string at the given position as bytes.
+        """
+        start = self._strings_start
+        return self._buffer[start + self._offsets[position]:
+                            start + self._offsets[position + 1]]
+
+    def _search(self, word: str) -> int:
+        """
+        Returns the feature index of the word or -1.
+        """
+        key = word.encode('utf-8')
+        low, high = 0, len(self._order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._string(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._order) and self._string(low) == key:
+            return self._order[low]
+        return -1
+
+    def get(self, word: str, default=None):
+        ind_word = self._lookup(word)
+        return default if ind_word < 0 else ind_word
+
+    def __getitem__(self, word: str) -> int:
+        ind_word = self._lookup(word)
+        if ind_word < 0:
+            raise KeyError(word)
+        return ind_word
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self._lookup(word) >= 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[str]:
+        for position in self._positions:
+            yield self._string(position).decode('utf-8')
+
+
+class MappedFeatureNames(Sequence):
+    """
+    A read-only list of feature names backed by MappedVocabulary.
+    """
+
+    def __init__(self, vocab: MappedVocabulary):
+        self._vocab = vocab
+
+    def __getitem__(self, ind_word):
+        if isinstance(ind_word, slice):
+            return [self[index]
+                    for index in range(*ind_word.indices(len(self)))]
+        position = self._vocab._positions[ind_word]
+        return self._vocab._string(position).decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+
+def _tokenizer_config(tokenizer: Tokenizer) -> dict:
+    return {
+        'token_pattern': tokenizer.token_pattern,
+        'lowercase': tokenizer.lowercase,
+        'stop_words': sorted(tokenizer.stop_words),
+        'ngram_range': list(tokenizer.ngram_range),
+        'analyzer': tokenizer.analyzer,
+        'cache_size': tokenizer.cache_size
+    }
+
+
+def save_vectorizer(vectorizer: Union[CountVectorizer, TfidfVectorizer],
+                    path: str,
+                    matrix: Optional[CSRMatrix] = None):
+    """
+    Saves a fitted vectorizer to a compact binary file: the vocabulary
+    as a sorted UTF-8 string table with offsets, the idf and document
+    frequencies as flat arrays and, optionally, a CSR document matrix.
+    Sections are 8-byte aligned so they can be used in place after
+    load_vectorizer maps the file. The file is written next to path
+    and then moved over it, so processes that have mapped the old
+    file keep using it safely.
+
+    Args:
+        vectorizer (CountVectorizer or TfidfVectorizer): The fitted
+        vectorizer.
+        path (str): The file path.
+        matrix (CSRMatrix): An optional document matrix to store.
+    """
+    flags = 0
+    counter = vectorizer
+    idf = array('d')
+    if isinstance(vectorizer, TfidfVectorizer):
+        flags |= _TFIDF
+        counter = vectorizer.transformer
+        idf = array('d', counter.idf)
+    if counter.sparse:
+        flags |= _SPARSE
+    words = [word.encode('utf-8') for word in counter.feature_names]
+    order = array('i', sorted(range(len(words)), key=words.__getitem__))
+    positions = array('i', bytes(4 * len(order)))
+    offsets = array('Q', [0])
+    strings = bytearray()
+    for position, ind_word in enumerate(order):
+        positions[ind_word] = position
+        strings += words[ind_word]
+        offsets.append(len(strings))
+    config = {'tokenizer': _tokenizer_config(counter.tokenizer),
+              'n_jobs': counter.n_jobs}
+    if flags & _TFIDF:
+        config['dtype'] = counter.dtype
+    config = json.dumps(config).encode('utf-8')
+    sections = {
+        'config': config,
+        'offsets': offsets.tobytes(),
+        'strings': bytes(strings),
+        'order': order.tobytes(),
+        'positions': positions.tobytes(),
+        'idf': idf.tobytes(),
+        'document_frequency': array('q', counter.document_frequency).tobytes()
+    }
+    if matrix is not None:
+        flags |= _MATRIX
+        data = matrix.data
+        typecode = data.typecode if isinstance(data, array) else data.format
+        if typecode == 'f':
+            flags |= _FLOAT_DATA | _FLOAT32_DATA
+            data = array('f', data)
+        elif typecode == 'd':
+            flags |= _FLOAT_DATA
+            data = array('d', data)
+        else:
+            data = array('q', data)
+        sections['indptr'] = array('q', matrix.indptr).tobytes()
+        sections['indices'] = array('i', matrix.indices).tobytes()
+        sections['data'] = data.tobytes()
+        n_cols = matrix.n_cols
+    else:
+        n_cols = 0
+    offset = _HEADER.size + _SECTION.size * len(_SECTIONS) + 8
+    table = []
+    for name in _SECTIONS:
+        offset += -offset % 8
+        payload = sections.get(name, b'')
+        table.append((offset, len(payload)))
+        offset += len(payload)
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, flags, len(order),
+                                counter.n_documents))
+        for section in table:
+            file.write(_SECTION.pack(*section))
+        file.write(struct.pack('<Q', n_cols))
+        for name, (section_offset, _) in zip(_SECTIONS, table):
+            file.write(b'\0' * (section_offset - file.tell()))
+            file.write(sections.get(name, b''))
+    os.replace(temporary_path, path)
+
+
+def load_vectorizer(
+        path: str
+) -> Tuple[Union[CountVectorizer, TfidfVectorizer], Optional[CSRMatrix]]:
+    """
+    Loads a vectorizer saved with save_vectorizer by memory-mapping
+    the file: nothing is parsed up front, the arrays are used in place
+    and processes loading the same file share its pages. The loaded
+    vocabulary is read-only; fit() replaces it with a fresh one and
+    partial_fit() first copies it into an ordinary dict and lists.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        result (tuple): The vectorizer and the stored document matrix
+        (None if the file has none).
+    """
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, flags, n_terms, n_documents = _HEADER.unpack_from(
+        buffer)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f'{path} is not a saved vectorizer')
+    table = {}
+    for number, name in enumerate(_SECTIONS):
+        table[name] = _SECTION.unpack_from(
+            buffer, _HEADER.size + _SECTION.size * number)
+    (n_cols,) = struct.unpack_from(
+        '<Q', buffer, _HEADER.size + _SECTION.size * len(_SECTIONS))
+    view = memoryview(buffer)
+
+    def section(name: str, typecode: str) -> memoryview:
+        offset, length = table[name]
+        return view[offset:offset + length].cast(typecode)
+
+    offset, length = table['config']
+    config = json.loads(buffer[offset:offset + length].decode('utf-8'))
+    tokenizer = Tokenizer(**config['tokenizer'])
+    sparse = bool(flags & _SPARSE)
+    if flags & _TFIDF:
+        vectorizer = TfidfVectorizer(sparse, config['n_jobs'], tokenizer,
+                                     config.get('dtype', 'd'))
+        counter = vectorizer.transformer
+        counter.idf = section('idf', 'd')
+    else:
+        vectorizer = counter = CountVectorizer(sparse, config['n_jobs'],
+                                               tokenizer)
+    counter.vocab = MappedVocabulary(
+        buffer, table['strings'][0], section('offsets', 'Q'),
+        section('order', 'i'), section('positions', 'i'))
+    counter.feature_names = MappedFeatureNames(counter.vocab)
+    counter.document_frequency = section('document_frequency', 'q')
+    counter.n_documents = n_documents
+    matrix = None
+    if flags & _MATRIX:
+        if flags & _FLOAT32_DATA:
+            typecode = 'f'
+        elif flags & _FLOAT_DATA:
+            typecode = 'd'
+        else:
+            typecode = 'q'
+        matrix = CSRMatrix(section('indptr', 'q'), section('indices', 'i'),
+                           section('data', typecode), n_cols)
+    return vectorizer, matrix